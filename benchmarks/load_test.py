@@ -0,0 +1,154 @@
+"""Load test for the search service (`python -m src.server`).
+
+Run from the repository root against a local instance:
+
+    python -m src.server data/processed/<zip name>/metadata.json &
+    python -m benchmarks.load_test --url http://127.0.0.1:8765 --concurrency 32 --duration 20
+
+Each client keeps one HTTP/1.1 connection open and sends random class,
+count and confidence queries built from `/classes` back to back. The report
+(JSON, also written to `--output`) gives throughput and p50/p95/p99 latency
+overall and per endpoint.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+
+async def request(reader, writer, host, target):
+    """Send one GET on an open connection and return `(status, body)`."""
+    writer.write(
+        f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode(
+            "latin-1"
+        )
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunks.append(await reader.readexactly(size + 2))
+            if size == 0:
+                break
+        return status, b"".join(chunk[:-2] for chunk in chunks)
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+def random_query(rng, classes, count_options, stream_share):
+    selected = rng.sample(classes, rng.randint(1, min(3, len(classes))))
+    params = {"classes": ",".join(selected), "mode": rng.choice(["or", "and"])}
+    for cls in selected:
+        if rng.random() < 0.3 and count_options.get(cls):
+            params[f"max_count.{cls}"] = rng.choice(count_options[cls])
+        if rng.random() < 0.3:
+            params[f"min_conf.{cls}"] = round(rng.uniform(0.3, 0.9), 2)
+    if rng.random() < stream_share:
+        return "search.stream", "/search?" + urlencode(dict(params, stream=1))
+    params["page"] = rng.randint(1, 3)
+    return "search", "/search?" + urlencode(params)
+
+
+async def client(url, classes, count_options, deadline, samples, seed, stream_share):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port)
+    try:
+        while time.perf_counter() < deadline:
+            name, target = random_query(rng, classes, count_options, stream_share)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, url.netloc, target)
+            samples.append((name, status, (time.perf_counter() - start) * 1000))
+    finally:
+        writer.close()
+
+
+def latency_summary(latencies, elapsed):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if not len(latencies):
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "qps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+    }
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port)
+    status, body = await request(reader, writer, url.netloc, "/classes")
+    writer.close()
+    if status != 200:
+        raise SystemExit(f"/classes returned {status}")
+    options = json.loads(body)
+    if not options["classes"]:
+        raise SystemExit("the service has no classes to query")
+
+    samples = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            client(
+                url,
+                options["classes"],
+                options["count_options"],
+                deadline,
+                samples,
+                args.seed + i,
+                args.stream_share,
+            )
+            for i in range(args.concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+        "errors": sum(1 for _, status, _ in samples if status != 200),
+        "overall": latency_summary([ms for _, _, ms in samples], elapsed),
+        "endpoints": {
+            name: latency_summary([ms for n, _, ms in samples if n == name], elapsed)
+            for name in sorted({n for n, _, _ in samples})
+        },
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument(
+        "--stream-share", type=float, default=0.1, help="fraction of streamed NDJSON searches"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report JSON here")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Offline benchmarks for the ingestion, metadata, search and rendering hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --suites metadata,search --sizes 10000,100000,1000000
+    python -m benchmarks.run compare baseline.json bench.json --threshold 0.10
+
+Everything is generated locally: images are random JPEGs and, unless
+`--weights` is given, the model is a randomly initialised yolo11n built from
+its YAML definition, so no download is needed. Results are written as JSON;
+`compare` exits non-zero when any metric regressed by more than the
+threshold.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from src.render import detections_svg, image_to_base64
+from src.search_index import AND_MODE, OR_MODE, SearchIndex
+from src.utils import get_unique_classes, load_metadata, save_metadata
+
+SUITES = ("ingest", "metadata", "search", "render")
+CLASSES = ["person", "car", "bicycle", "dog", "cat", "truck", "bus", "bird"]
+
+
+def measure(fn, repeat=5):
+    """Return the median wall time of `repeat` calls to `fn`, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def synthetic_images(directory, count, size=(640, 480), seed=0):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for idx in range(count):
+        pixels = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        path = Path(directory) / f"img_{idx:05d}.jpg"
+        Image.fromarray(pixels).save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def synthetic_metadata(count, seed=0, width=1280, height=960):
+    """Metadata in the `save_metadata` layout with 0-8 detections per image."""
+    rng = random.Random(seed)
+    metadata = []
+    for idx in range(count):
+        detections = []
+        for _ in range(rng.randint(0, 8)):
+            x1, y1 = rng.uniform(0, width - 20), rng.uniform(0, height - 20)
+            detections.append(
+                {
+                    "class": rng.choice(CLASSES),
+                    "confidence": rng.uniform(0.3, 1.0),
+                    "bbox": [x1, y1, rng.uniform(x1 + 10, width), rng.uniform(y1 + 10, height)],
+                    "count": 1,
+                }
+            )
+        class_counts = {}
+        for det in detections:
+            class_counts[det["class"]] = class_counts.get(det["class"], 0) + 1
+        for det in detections:
+            det["count"] = class_counts[det["class"]]
+        metadata.append(
+            {
+                "image_path": f"data/raw/synthetic/img_{idx:07d}.jpg",
+                "detections": detections,
+                "total_objects": len(detections),
+                "unique_class": list(class_counts.keys()),
+                "class_counts": class_counts,
+            }
+        )
+    return metadata
+
+
+def random_queries(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        selected = rng.sample(CLASSES, rng.randint(1, 3))
+        yield {
+            "search_mode": rng.choice([OR_MODE, AND_MODE]),
+            "selected_classes": selected,
+            "thresholds": {cls: rng.choice(["None", "None", "1", "3"]) for cls in selected},
+        }
+
+
+def synthetic_weights(directory):
+    from ultralytics import YOLO
+
+    weights_path = Path(directory) / "yolo11n-random.pt"
+    YOLO("yolo11n.yaml").save(str(weights_path))
+    return str(weights_path)
+
+
+def bench_ingest(args, workdir):
+    from src.inference import YOLOv11Inference
+
+    results = {}
+    image_dir = Path(workdir) / "raw" / "images"
+    image_dir.mkdir(parents=True)
+    image_paths = synthetic_images(image_dir, args.images)
+    weights = args.weights or synthetic_weights(workdir)
+
+    inference = YOLOv11Inference(weights, device=args.device)
+    inference.workers = 1
+    inference.model  # load and warm up outside the timed region
+
+    elapsed = measure(lambda: [inference.process_image(p) for p in image_paths], repeat=1)
+    results["ingest.process_image"] = metric(len(image_paths) / elapsed, "images/s", "higher")
+
+    for batch_size in args.batch_sizes:
+        elapsed = measure(
+            lambda: inference.process_batch(image_paths, batch_size=batch_size), repeat=1
+        )
+        results[f"ingest.process_batch.bs{batch_size}"] = metric(
+            len(image_paths) / elapsed, "images/s", "higher"
+        )
+
+    for workers in args.workers:
+        inference.workers = workers
+        elapsed = measure(lambda: inference.process_directory(image_dir), repeat=1)
+        results[f"ingest.process_directory.workers{workers}"] = metric(
+            len(image_paths) / elapsed, "images/s", "higher"
+        )
+    return results
+
+
+def bench_metadata(args, workdir):
+    results = {}
+    for size in args.sizes:
+        metadata = synthetic_metadata(size)
+        raw_path = Path(workdir) / "raw" / f"metadata_{size}"
+        metadata_path = save_metadata(metadata, raw_path)  # warm the directory
+
+        results[f"metadata.{size}.get_unique_classes"] = metric(
+            measure(lambda: get_unique_classes(metadata), repeat=3), "s", "lower"
+        )
+        results[f"metadata.{size}.save_metadata"] = metric(
+            measure(lambda: save_metadata(metadata, raw_path), repeat=1), "s", "lower"
+        )
+        results[f"metadata.{size}.load_metadata"] = metric(
+            measure(lambda: load_metadata(metadata_path), repeat=1), "s", "lower"
+        )
+        results[f"metadata.{size}.file_size"] = metric(
+            metadata_path.stat().st_size / 1e6, "MB", "lower"
+        )
+    return results
+
+
+def bench_search(args, workdir):
+    results = {}
+    for size in args.sizes:
+        metadata = synthetic_metadata(size)
+        results[f"search.{size}.build_index"] = metric(
+            measure(lambda: SearchIndex(metadata), repeat=1), "s", "lower"
+        )
+        index = SearchIndex(metadata)
+        latencies = []
+        for query in random_queries(args.queries):
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[f"search.{size}.query_p50"] = metric(
+            float(np.percentile(latencies, 50)), "ms", "lower"
+        )
+        results[f"search.{size}.query_p95"] = metric(
+            float(np.percentile(latencies, 95)), "ms", "lower"
+        )
+    return results
+
+
+def bench_render(args, workdir):
+    results = {}
+    detections = synthetic_metadata(64, seed=1)
+    detections = [det for item in detections for det in item["detections"]][:8]
+    search_parameters = {"selected_classes": CLASSES[:3]}
+    pixels = np.random.default_rng(0).integers(0, 255, (960, 1280, 3), dtype=np.uint8)
+    original = Image.fromarray(pixels)
+
+    results["render.detections_svg"] = metric(
+        measure(
+            lambda: detections_svg(detections, 1280, 960, search_parameters, True), repeat=20
+        )
+        * 1000,
+        "ms/image",
+        "lower",
+    )
+    results["render.image_to_base64"] = metric(
+        measure(lambda: image_to_base64(original), repeat=20) * 1000, "ms/image", "lower"
+    )
+    buffer = io.BytesIO()
+    original.save(buffer, format="JPEG")
+    encoded = buffer.getvalue()
+    results["render.image_to_base64.jpeg_bytes"] = metric(
+        measure(lambda: image_to_base64(encoded), repeat=20) * 1000, "ms/image", "lower"
+    )
+    return results
+
+
+BENCHMARKS = {
+    "ingest": bench_ingest,
+    "metadata": bench_metadata,
+    "search": bench_search,
+    "render": bench_render,
+}
+
+
+def run(args):
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k != "command"},
+        },
+        "results": {},
+        "skipped": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for suite in args.suites:
+            print(f"Running {suite}...", file=sys.stderr)
+            try:
+                report["results"].update(BENCHMARKS[suite](args, workdir))
+            except ImportError as e:
+                report["skipped"][suite] = str(e)
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+
+
+def compare(args):
+    """Print every metric of two runs side by side and flag regressions."""
+    baseline = json.loads(Path(args.baseline).read_text())["results"]
+    current = json.loads(Path(args.current).read_text())["results"]
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name]["value"], current[name]["value"]
+        change = (new - old) / old if old else 0.0
+        worse = change < -args.threshold if current[name]["better"] == "higher" else change > args.threshold
+        flag = "REGRESSION" if worse else ""
+        print(f"{name:55s} {old:12.4f} {new:12.4f} {change:+8.1%} {current[name]['unit']:10s} {flag}")
+        if worse:
+            regressions.append(name)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    raise SystemExit(1 if regressions else 0)
+
+
+def parse_ints(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--sizes", type=parse_ints, default=[10000, 100000])
+    parser.add_argument("--images", type=int, default=64, help="synthetic images for ingest")
+    parser.add_argument("--batch-sizes", type=parse_ints, default=[1, 4, 8, 16])
+    parser.add_argument("--workers", type=parse_ints, default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--weights", help="model weights (default: random yolo11n)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args)
+    else:
+        args.suites = [s for s in args.suites.split(",") if s]
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,19 @@ import streamlit as st
 # import sys
 from pathlib import Path
 import time
-from src.inference import YOLOv11Inference
-from src.utils import get_unique_classes, save_metadata, load_metadata
+from src.utils import ensure_dir_exists
+from src.incremental import IncrementalIndex, file_digest, model_fingerprint
+from src.index_registry import IndexRegistry
+from src.columnar import ColumnarMetadata
+from src.metadata_log import MetadataLog
+from src.thumbnails import ThumbnailCache
+from src.config import load_config
+from src.render import detections_svg, image_to_base64
+from src.profiling import profile_run
 import tempfile
 from typing import Optional
-import zipfile
-import shutil
 import os
-from PIL import Image, ImageDraw, ImageFont
-import base64
+import hashlib
 
 # add src to path
 # sys.path.append(str(Path(__file__).parent))
@@ -24,15 +28,18 @@ def init_session_state():
     """
     session_defaults = {
         "image_dir": "path",
-        "metadata": None,
-        "unique_classes": [],
-        "count_options": {},
+        # the dataset itself is shared process-wide (see `get_index_registry`);
+        # a session only remembers which one it is looking at
+        "metadata_path": None,
         "search_parameters": {
             "search_mode": "Any of the selected classes (OR)",
             "selected_classes": [],
             "thresholds": {},
+            "filters": {},
         },
         "search_results": [],
+        "results_page": 1,
+        "page_size": configured_page_size(),
         "show_boxes": True,
         "grid_columns": 3,
         "highlight_matches": True,
@@ -62,18 +69,40 @@ def save_uploaded_tempfile(uploaded_file, suffix: str) -> Optional[str]:
     return tmp_file.name
 
 
-def start_inference(zip_path: str, model_path: Optional[str]):
-    """Extract a ZIP file, process images in the extracted folder, cleanup and
-    return (metadata, metadata_path).
+def save_uploaded_weights(uploaded_file) -> Optional[str]:
+    """Save uploaded model weights under a name derived from their content.
+
+    Unlike `save_uploaded_tempfile` this is idempotent: Streamlit reruns and
+    repeated uploads of the same weights reuse one file, which keeps the
+    model registry and any exported backends pointed at a stable path.
+    """
+    if uploaded_file is None:
+        return None
+    buffer = uploaded_file.getbuffer()
+    digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
+    weights_path = Path(tempfile.gettempdir()) / f"yolo-weights-{digest}.pt"
+    if not weights_path.exists():
+        tmp_path = weights_path.with_suffix(".part")
+        tmp_path.write_bytes(buffer)
+        os.replace(tmp_path, weights_path)
+    return str(weights_path)
+
+
+def start_inference(zip_file, model_path: Optional[str]):
+    """Process the images inside a ZIP file without extracting it and return
+    (metadata, metadata_path).
+
+    Members are decoded in memory; only the images needed later for display
+    are written to `data.upload_dir/<zip name>` (see `data.persist_uploads`).
 
     Args:
-        zip_path: Path to the uploaded ZIP file on disk.
+        zip_file: The uploaded ZIP file object (or a path to a ZIP on disk).
         model_path: Optional path to a model weights file.
 
     Returns:
         Tuple (metadata, metadata_path) on success, or (None, None) on failure.
     """
-    if not zip_path:
+    if not zip_file:
         st.warning("No ZIP file provided to start_inference.")
         return None, None
     if not model_path:
@@ -82,37 +111,79 @@ def start_inference(zip_path: str, model_path: Optional[str]):
         )
         return None, None
 
-    extract_dir = tempfile.mkdtemp()
+    config = load_config()["data"]
+    zip_name = Path(getattr(zip_file, "name", str(zip_file))).stem
+    image_dir = Path(config.get("upload_dir", "data/raw")) / zip_name
     metadata = None
     metadata_path = None
+    source = None
     try:
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(extract_dir)
+        from src.archive import ZipImageSource
 
-        metadata, metadata_path = api_process_images(extract_dir, model_path=model_path)
+        source = ZipImageSource(
+            zip_file,
+            image_dir,
+            config["image_extensions"],
+            persist=config.get("persist_uploads", "detections"),
+        )
+        metadata, metadata_path = api_process_images(
+            image_dir, model_path=model_path, source=source
+        )
 
     except Exception as e:
-        st.error(f"Unable to extract/process ZIP: {e}")
+        st.error(f"Unable to read/process ZIP: {e}")
         st.code(traceback.format_exc())
         metadata = None
         metadata_path = None
 
     finally:
-        # Cleanup extracted files and uploaded zip file
-        try:
-            if os.path.exists(extract_dir):
-                shutil.rmtree(extract_dir)
-        except Exception:
-            pass
-        try:
-            if zip_path and os.path.exists(zip_path):
-                os.remove(zip_path)
-        except Exception:
-            pass
+        if source is not None:
+            source.close()
 
     return metadata, metadata_path
 
 
+@st.cache_resource
+def get_index_registry():
+    """Process-wide registry of loaded datasets shared by all sessions."""
+    config = load_config()
+    index_config = config.get("index", {})
+    return IndexRegistry(
+        cache_dir=index_config.get("cache_dir", "data/index"),
+        max_datasets=index_config.get("max_datasets", 4),
+        search_cache_size=config.get("ui", {}).get("search_cache_size", 64),
+    )
+
+
+def reset_search_results():
+    """Drop the session's search results; they are image ids into the
+    active dataset and mean nothing once it changes."""
+    st.session_state.search_results = []
+    st.session_state.results_page = 1
+
+
+def store_metadata(metadata_path, records=None):
+    """Make the metadata at `metadata_path` the session's active dataset and
+    return it; `records` are its parsed contents, if already at hand."""
+    dataset = get_index_registry().get(metadata_path, records)
+    st.session_state.metadata_path = str(metadata_path)
+    reset_search_results()
+    return dataset
+
+
+def current_dataset():
+    """The session's active dataset, or None."""
+    if st.session_state.metadata_path is None:
+        return None
+    try:
+        return get_index_registry().get(st.session_state.metadata_path)
+    except OSError as e:
+        st.warning(f"Metadata is no longer available: {e}")
+        st.session_state.metadata_path = None
+        reset_search_results()
+        return None
+
+
 def layout_process_new_images():
     """
     ## Process New Images (Layout)
@@ -122,102 +193,271 @@ def layout_process_new_images():
         # Placeholder for image processing logic
         with col1:
             # Instead of supplying a folder path, the UI now accepts a ZIP
-            # containing images. The ZIP will be extracted and processed.
+            # containing images. Its members are read straight from the
+            # upload buffer, nothing is extracted to scratch space.
             uploaded_zip = st.file_uploader("Upload Images ZIP", type=["zip"])
-            image_dir = None
-            if uploaded_zip is not None:
-                # Save uploaded zip to a temporary file
-                zip_path = save_uploaded_tempfile(uploaded_zip, suffix=".zip")
-                image_dir = None
         with col2:
             uploaded_model = st.file_uploader("Upload Model Weights (.pt)", type=["pt"])
-            model_path = save_uploaded_tempfile(uploaded_model, suffix=".pt")
+            model_path = save_uploaded_weights(uploaded_model)
         start_inference_button = st.button("Start Inference")
         if start_inference_button:
-            if uploaded_zip is not None and zip_path is not None:
+            if uploaded_zip is not None:
                 with st.spinner("Processing images..."):
-                    metadata, metadata_path = start_inference(zip_path, model_path)
-
-                # If metadata is None, an error was already shown inside start_inference
-                if metadata is not None:
-                    unique_classes, count_options = get_unique_classes(metadata)
+                    metadata, metadata_path = start_inference(uploaded_zip, model_path)
+
+                # If metadata is None, an error was already shown inside start_inference;
+                # without a metadata path there were no images, which was shown too
+                if metadata is None or metadata_path is None:
+                    pass
+                elif len(metadata) == 0:
+                    st.warning("None of the images could be processed, no metadata loaded.")
+                else:
+                    # the columnar store written during ingestion is mapped in
+                    # place instead of being converted again
+                    if load_config()["data"].get("columnar_metadata", False):
+                        dataset = store_metadata(Path(metadata_path).with_suffix(".columnar"))
+                    else:
+                        dataset = store_metadata(metadata_path, metadata)
 
                     st.success(f"Processed {len(metadata)} images,  metadata saved")
                     st.code(f"Metadata Path: {metadata_path}")
-                    st.code(f"Unique Classes: {unique_classes}")
-                    st.code(f"Count Options: {count_options}")
-
-                    st.session_state.metadata = metadata
-                    st.session_state.unique_classes = unique_classes
-                    st.session_state.count_options = count_options
+                    st.code(f"Unique Classes: {dataset.unique_classes}")
+                    st.code(f"Count Options: {dataset.count_options}")
 
             else:
                 st.warning("Please upload a ZIP file containing images.")
 
 
-def api_process_images(image_dir, model_path):
+def api_process_images(image_dir, model_path, source=None):
     """
     ## Process New Images (API)
+
+    Processes the images under `image_dir`, or the images of `source` (e.g. a
+    `ZipImageSource`) addressed as if they lived under `image_dir`.
     """
+    # the inference stack (ultralytics, torch, OpenCV) is only imported once
+    # a job starts, so loading and searching metadata never pays for it; see
+    # `python -m src.profiling imports`
+    from src.cascade import CascadeInference, cascade_fingerprint
+    from src.dedup import duplicate_record, find_duplicates
+    from src.inference import YOLOv11Inference
+
     inference = YOLOv11Inference(model_path)
+    cascade = inference.config.get("cascade", {})
+    if cascade.get("enabled", False):
+        inference = CascadeInference(
+            inference, cascade["fast_model"], margin=cascade.get("margin", 0.15)
+        )
 
-    # Collect image paths using the inference helper so extensions stay in sync
-    image_paths = inference.list_image_paths(image_dir)
+    if source is None:
+        # Collect image paths using the inference helper so extensions stay in sync
+        image_paths = inference.list_image_paths(image_dir)
+    else:
+        image_paths = source.image_paths
 
     total = len(image_paths)
     if total == 0:
         st.warning("No images found in the provided directory.")
         return [], None
 
+    model_fp = model_fingerprint(
+        model_path, inference.conf_threshold, inference.backend
+    )
+    if cascade.get("enabled", False):
+        model_fp += cascade_fingerprint(cascade["fast_model"], inference.margin)
+    cached, todo = {}, image_paths
+    incremental = None
+    if inference.config["data"].get("incremental", False):
+        # reuse detections for images unchanged since the last run; archive
+        # members are fingerprinted from the ZIP directory
+        incremental = IncrementalIndex(image_dir, model_fp, source=source)
+        cached, todo = incremental.partition(image_paths)
+
+    # every record is streamed to an append-only log as soon as it exists; a
+    # restarted job resumes from whatever the log already holds
+    processed_path = ensure_dir_exists(image_dir)
+    log = MetadataLog(
+        processed_path / "metadata.jsonl",
+        key=model_fp,
+        fsync_every=inference.config["data"].get("log_fsync_every", 64),
+    )
+
+    # unchanged images already have a verified digest in the incremental index
+    known_digests = {str(p): incremental.digest(p) for p in cached}
+
+    def image_digest(img_path):
+        # content digest logged with every record, checked before resuming
+        digest = known_digests.get(str(img_path))
+        if digest:
+            return digest
+        if source is not None:
+            return source.digest(img_path)
+        return file_digest(img_path)
+
+    for md in cached.values():
+        if md["image_path"] not in log.committed:
+            log.append(md, image_digest(md["image_path"]))
+    # a logged record only counts for the same content under the same path
+    resumed = {
+        str(p)
+        for p in todo
+        if str(p) in log.committed and log.is_committed(p, image_digest(p))
+    }
+    todo = [p for p in todo if str(p) not in resumed]
+
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    metadata = []
-    for idx, img_path in enumerate(image_paths, start=1):
-        try:
-            md = inference.process_image(img_path)
-            metadata.append(md)
-        except Exception as e:
-            # show the error but continue processing remaining images
-            st.error(f"Error processing {img_path}: {e}")
-            continue
-
-        pct = int((idx / total) * 100)
-        progress_bar.progress(pct)
-        image_name = Path(img_path).name
-        status_text.text(f"Processing {image_name} - {idx}/{total} ({pct}%)")
+    # burst shots and re-exported copies are inferred once per group
+    copies = {}  # canonical image path -> [(duplicate path, size or None)]
+    dedup = inference.config.get("dedup", {})
+    if dedup.get("enabled", False) and len(todo) > 1:
+        status_text.text("Looking for duplicate images...")
+        duplicates = find_duplicates(
+            todo,
+            read=source.read if source is not None else None,
+            threshold=dedup.get("hamming_threshold", 6),
+            workers=inference.decode_workers,
+            depth=inference.prefetch_depth,
+        )
+        for dup_path, (canonical, size) in duplicates.items():
+            copies.setdefault(canonical, []).append((dup_path, size))
+        todo = [p for p in todo if str(p) not in duplicates]
+
+    def report_error(img_path, e):
+        # show the error but continue processing remaining images
+        st.error(f"Error processing {img_path}: {e}")
+
+    thumbnails_at_index = inference.config["thumbnails"].get("at_index", False)
+    profiling = inference.config.get("profiling", {})
+    timings_view = st.empty()
+    last_refresh = 0.0
+    idx = len(cached) + len(resumed)
+    inferred = set()  # canonical images that produced a record
+    with profile_run(
+        profiling.get("mode"), processed_path, profiling.get("interval_ms", 10)
+    ):
+        for batch, batch_metadata in inference.iter_batches(
+            todo,
+            on_error=report_error,
+            loader=source.load if source is not None else None,
+        ):
+            duplicate_paths, duplicate_metadata = [], []
+            for md in batch_metadata:
+                inferred.add(md["image_path"])
+                for dup_path, size in copies.get(md["image_path"], ()):
+                    duplicate_paths.append(dup_path)
+                    duplicate_metadata.append(duplicate_record(md, dup_path, size))
+            batch = list(batch) + duplicate_paths
+            batch_metadata = list(batch_metadata) + duplicate_metadata
+            for md in batch_metadata:
+                digest = image_digest(md["image_path"])
+                with inference.timings.time("serialize"):
+                    log.append(md, digest)
+            if source is not None:
+                source.finish(
+                    batch,
+                    batch_metadata,
+                    on_bytes=get_thumbnail_cache().put if thumbnails_at_index else None,
+                )
+
+            if not batch:
+                continue
+            idx += len(batch)
+            pct = int((idx / total) * 100)
+            progress_bar.progress(pct)
+            image_name = Path(batch[-1]).name
+            status_text.text(f"Processing {image_name} - {idx}/{total} ({pct}%)")
+            if time.monotonic() - last_refresh > 2:
+                layout_stage_timings(timings_view, inference.timings.summary())
+                last_refresh = time.monotonic()
+
+    # duplicates have no detections of their own when their canonical image
+    # failed; they are reported like any other failure and retried next run
+    for canonical, duplicates in copies.items():
+        if canonical not in inferred:
+            for dup_path, _ in duplicates:
+                report_error(dup_path, f"duplicate of {canonical}, which could not be processed")
+
+    timings = inference.timings.summary()
+    layout_stage_timings(timings_view, timings)
+    inference.timings.save(processed_path / "timings.json")
+
+    if thumbnails_at_index and source is None:
+        status_text.text("Generating thumbnails...")
+        get_thumbnail_cache().warm(image_paths, workers=inference.decode_workers)
 
     # finalize UI
     progress_bar.progress(100)
-    status_text.text("Completed")
-
-    metadata_path = save_metadata(metadata, image_dir)
+    if isinstance(inference, CascadeInference):
+        status_text.text(f"Completed ({inference.escalated} images escalated to the full model)")
+    else:
+        status_text.text("Completed")
+
+    # compact the log into metadata.json in directory order; images that were
+    # deleted since the last run simply drop out
+    metadata_path = log.compact(processed_path / "metadata.json", image_paths)
+    # the returned metadata is built straight from the log, one record at a
+    # time, instead of loading metadata.json back into memory
+    metadata = ColumnarMetadata.from_records(log.iter_records(image_paths))
+    if inference.config["data"].get("columnar_metadata", False):
+        metadata.save(Path(metadata_path).with_suffix(".columnar"))
+    if incremental is not None:
+        incremental.save(
+            [p for p in image_paths if str(p) in log.committed], log.digests()
+        )
+    log.remove()
     return metadata, metadata_path
 
 
+def layout_stage_timings(placeholder, summary):
+    """Show per-stage latency percentiles and throughput of an indexing run."""
+    with placeholder.container():
+        st.text(
+            f"{summary['images']} images in {summary['elapsed_s']:.1f}s "
+            f"({summary['images_per_s']:.1f} images/s)"
+        )
+        st.table(
+            [
+                {
+                    "stage": stage,
+                    "p50 (ms)": round(stats["p50_ms"], 2),
+                    "p95 (ms)": round(stats["p95_ms"], 2),
+                    "p99 (ms)": round(stats["p99_ms"], 2),
+                    "total (s)": round(stats["total_s"], 2),
+                }
+                for stage, stats in summary["stages"].items()
+            ]
+        )
+
+
 def layout_load_existing_metadata():
     with st.expander("Load Existing Metadata", expanded=True):
         # Placeholder for loading metadata logic
         uploaded_model = st.file_uploader("Upload Metadata File", type=["json"])
 
-        metadata_path = save_uploaded_tempfile(uploaded_model, suffix=".json")
+        columnar_dir = st.text_input(
+            "Or Columnar Metadata Directory (on the server)",
+            help="A metadata.columnar directory written during ingestion; it is memory-mapped instead of parsed.",
+        )
+
+        metadata_path = columnar_dir or save_uploaded_tempfile(
+            uploaded_model, suffix=".json"
+        )
         load_metadata_button = st.button("Load Metadata")
         if load_metadata_button:
             if metadata_path:
                 st.spinner("Loading metadata...")
 
                 try:
-                    metadata = load_metadata(metadata_path)
-                    unique_classes, count_options = get_unique_classes(metadata)
+                    # JSON is converted once to a memory-mapped store shared
+                    # by every session; columnar directories are mapped as is
+                    dataset = store_metadata(metadata_path)
 
-                    st.success(f"Found {len(metadata)} images,  metadata loaded")
+                    st.success(f"Found {len(dataset.metadata)} images,  metadata loaded")
                     st.code(f"Metadata Path: {metadata_path}")
-                    st.code(f"Unique Classes: {unique_classes}")
-                    st.code(f"Count Options: {count_options}")
-
-                    st.session_state.metadata = metadata
-                    st.session_state.unique_classes = unique_classes
-                    st.session_state.count_options = count_options
+                    st.code(f"Unique Classes: {dataset.unique_classes}")
+                    st.code(f"Count Options: {dataset.count_options}")
                 except Exception as e:
                     st.error(f"Error Loading Metadata: {e}")
                     st.code(traceback.format_exc())
@@ -235,39 +475,16 @@ def api_load_metadata(metadata_path):
     time.sleep(3)
 
 
-def api_search_images(search_parameters, metadata):
+def api_search_images(search_parameters, dataset):
     """
     ## Search Images (API)
     """
-    results = []
-    for item in metadata:
-        matches = False
-        class_matches = {}
-        for cls in search_parameters["selected_classes"]:
-            class_detections = [
-                det for det in item.get("detections", []) if det["class"] == cls
-            ]
-            class_count = len(class_detections)
-            class_matches[cls] = False
-            threshold = search_parameters["thresholds"].get(cls, "None")
-            if threshold == "None":
-                if class_count >= 1:
-                    class_matches[cls] = True
-            else:
-                if class_count <= int(threshold):
-                    class_matches[cls] = True
-        if search_parameters["search_mode"] == "Any of the selected classes (OR)":
-            if any(class_matches.values()):
-                matches = True
-        else:  # All of the selected classes (AND)
-            if all(class_matches.values()):
-                matches = True
-        if matches:
-            results.append(item)
-    st.session_state.search_results = results
-
-
-def layout_search_images():
+    # results are kept as image ids into the shared metadata
+    st.session_state.search_results = dataset.search(search_parameters)
+    st.session_state.results_page = 1
+
+
+def layout_search_images(dataset):
     """
     ## Search Images Layout
     """
@@ -282,7 +499,7 @@ def layout_search_images():
         )
         classes_to_search = st.multiselect(
             "Classes to Search:",
-            options=st.session_state.unique_classes,
+            options=dataset.unique_classes,
             key="selected_classes",
         )
 
@@ -294,38 +511,110 @@ def layout_search_images():
                 with cols[i]:
                     threshold = st.selectbox(
                         f"Max Count for {cls}",
-                        options=["None"] + st.session_state.count_options[cls],
+                        options=["None"] + dataset.count_options[cls],
                         key=f"threshold_{cls}",
                     )
                     thresholds[cls] = threshold
+
+            filters = layout_search_filters(classes_to_search)
+        else:
+            filters = {}
         st.session_state.search_parameters["search_mode"] = search_mode
         st.session_state.search_parameters["selected_classes"] = classes_to_search
         st.session_state.search_parameters["thresholds"] = thresholds
+        st.session_state.search_parameters["filters"] = filters
 
     search_button = st.button("Search Images", type="primary")
     if search_button and classes_to_search:
         api_search_images(
-            st.session_state.search_parameters, st.session_state.metadata
+            st.session_state.search_parameters, dataset
         )  # Implement search logic here
 
-import base64
-import io
-def image_to_base64(image: Image.Image) -> str:
-		"""Convert an image file to a base64-encoded string."""
-		buffered = io.BytesIO()
-		image.save(buffered, format="PNG")
-		img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-		return img_base64
-
-def layout_image_box(image, meta_items, image_path):
-		"""Display an image with its metadata in a Streamlit box."""
-		img_base64 = image_to_base64(image)
+def layout_search_filters(classes_to_search):
+    """
+    ## Per-class detection filters (Layout)
+
+    Returns `{class: {filter: value}}`; unset inputs are None and ignored by
+    the search.
+    """
+    filters = {}
+    with st.expander("Advanced Filters (optional)"):
+        cols = st.columns(len(classes_to_search))
+        for i, cls in enumerate(classes_to_search):
+            with cols[i]:
+                st.markdown(f"**{cls}**")
+                filters[cls] = {
+                    "min_count": st.number_input(
+                        "Min Count", min_value=0, step=1, value=None, key=f"min_count_{cls}"
+                    ),
+                    "min_conf": st.number_input(
+                        "Min Confidence",
+                        min_value=0.0,
+                        max_value=1.0,
+                        step=0.05,
+                        value=None,
+                        key=f"min_conf_{cls}",
+                    ),
+                    "min_area": st.number_input(
+                        "Min Box Area (px²)", min_value=0.0, value=None, key=f"min_area_{cls}"
+                    ),
+                    "max_area": st.number_input(
+                        "Max Box Area (px²)", min_value=0.0, value=None, key=f"max_area_{cls}"
+                    ),
+                    "min_aspect": st.number_input(
+                        "Min Aspect (w/h)", min_value=0.0, value=None, key=f"min_aspect_{cls}"
+                    ),
+                    "max_aspect": st.number_input(
+                        "Max Aspect (w/h)", min_value=0.0, value=None, key=f"max_aspect_{cls}"
+                    ),
+                    **layout_region_filter(cls),
+                }
+    return filters
+
+
+# Named image regions as normalized (x1, y1, x2, y2)
+REGION_PRESETS = {
+    "Anywhere": None,
+    "Left third": (0.0, 0.0, 1 / 3, 1.0),
+    "Middle third": (1 / 3, 0.0, 2 / 3, 1.0),
+    "Right third": (2 / 3, 0.0, 1.0, 1.0),
+    "Top half": (0.0, 0.0, 1.0, 0.5),
+    "Bottom half": (0.0, 0.5, 1.0, 1.0),
+    "Custom": None,
+}
+
+
+def layout_region_filter(cls):
+    """
+    ## Region filter for one class (Layout)
+
+    Returns the `region` and `region_mode` filters understood by the search.
+    """
+    preset = st.selectbox("Region", list(REGION_PRESETS), key=f"region_{cls}")
+    region = REGION_PRESETS[preset]
+    if preset == "Custom":
+        x_range = st.slider("Horizontal", 0.0, 1.0, (0.0, 1.0), key=f"region_x_{cls}")
+        y_range = st.slider("Vertical", 0.0, 1.0, (0.0, 1.0), key=f"region_y_{cls}")
+        region = (x_range[0], y_range[0], x_range[1], y_range[1])
+    mode = st.radio(
+        "Box must",
+        ["intersects", "contains"],
+        format_func=lambda m: "Overlap region" if m == "intersects" else "Lie inside region",
+        key=f"region_mode_{cls}",
+        disabled=region is None,
+    )
+    return {"region": region, "region_mode": mode if region is not None else None}
+
+
+def layout_image_box(image_src, overlay, meta_items, image_path):
+		"""Display an image with its metadata in a Streamlit box; `overlay` is
+		SVG markup drawn over the image by the browser."""
 		meta_html = ", ".join(meta_items) if meta_items else "No matches";
 		image_name = Path(image_path).name
 		box_html = f"""
 		<div class="image-card">
 				<div class="image-container">
-					<img src="data:image/png;base64,{img_base64}"><br>
+					<img src="{image_src}" loading="lazy">{overlay}
 				</div>
 				<div class="meta-overlay">
 					<strong>{image_name}</strong><br/>{meta_html}
@@ -334,59 +623,65 @@ def layout_image_box(image, meta_items, image_path):
 		"""
 		st.markdown(box_html, unsafe_allow_html=True)
 
-def layout_draw_boxes(image, detections, search_parameters, highlight_matches):
-    """
-    Draw bounding boxes and labels on the image according to search parameters.
+@st.cache_resource
+def get_thumbnail_cache():
+    """Process-wide thumbnail cache shared by all sessions."""
+    config = load_config()["thumbnails"]
+    return ThumbnailCache(
+        cache_dir=config["cache_dir"],
+        size=config["size"],
+        quality=config["quality"],
+        max_disk_mb=config["max_disk_mb"],
+        max_memory_items=config["max_memory_items"],
+    )
+
+
+# served by Streamlit at app/static/ (server.enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+def thumbnail_src(image_path):
+    """Return `(src, (width, height))` for the thumbnail of `image_path`: a
+    static URL the browser fetches and caches once when the thumbnail cache
+    lives under static/ (thumbnail names change with the original), else the
+    encoded bytes inlined as a data URI."""
+    thumbnails = get_thumbnail_cache()
+    name, size = thumbnails.locate(image_path)
+    try:
+        relative = (thumbnails.cache_dir / name).resolve().relative_to(STATIC_DIR.resolve())
+        return f"app/static/{relative.as_posix()}", size
+    except ValueError:
+        data, _ = thumbnails.get(image_path)
+        return f"data:image/jpeg;base64,{image_to_base64(data)}", size
 
-    Args:
-        image: PIL.Image object (RGB)
-        detections: list of detection dicts (with 'class', 'bbox', 'confidence')
-        search_parameters: dict with 'selected_classes' (list)
-        highlight_matches: bool, whether to highlight matches
 
-    Returns:
-        PIL.Image with boxes and labels drawn
-    """
-    draw = ImageDraw.Draw(image)
-    try:
-        font = ImageFont.truetype("arial.ttf", 15)
-    except:
-        font = ImageFont.load_default()
-
-    for det in detections:
-        cls = det["class"]
-        bbox = det["bbox"]  # [x1, y1, x2, y2]
-        if cls in search_parameters["selected_classes"] and highlight_matches:
-            box_color = "#00ff00"  # Green for matches
-            thickness = 3
-        elif not highlight_matches:
-            box_color = "#c0c0c0"  # Gray for non-matches
-            thickness = 1
-        else:
-            continue
-
-        draw.rectangle(bbox, outline=box_color, width=thickness)
-        if cls in search_parameters["selected_classes"] or not highlight_matches:
-            label = f"{cls} ({det['confidence']:.2f})"
-            text_bbox = draw.textbbox((0, 0), label, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            draw.rectangle(
-                [bbox[0], bbox[1], bbox[0] + text_width + 4, bbox[1] + text_height + 4],
-                fill=box_color,
-            )
-            draw.text((bbox[0] + 2, bbox[1] + 2), label, fill="black", font=font)
+PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
 
-    return image
 
+def configured_page_size():
+    """`ui.page_size` snapped to the nearest of `PAGE_SIZE_OPTIONS`, since
+    the page size selectbox rejects any other value."""
+    configured = load_config().get("ui", {}).get("page_size", 24)
+    return min(PAGE_SIZE_OPTIONS, key=lambda size: abs(size - configured))
 
-def layout_search_results(results):
+
+def layout_search_results(results, dataset):
+    """Render the search results grid; `results` are image ids into the
+    dataset's metadata."""
     if len(results) == 0:
         st.info("No images found matching the search criteria.")
         return
 
     st.subheader("📷 Search Results")
     st.text("{} images  matching criteria".format(len(results)))
+    # summaries cover the full hit set, only the images are paged
+    summary = dataset.index.summarize(results)
+    st.text(
+        ", ".join(
+            f"{cls}: {objects} in {images} images"
+            for cls, (images, objects) in sorted(summary.items())
+        )
+    )
     with st.expander("Display Options", expanded=True):
         cols = st.columns(3)
         with cols[0]:
@@ -407,26 +702,53 @@ def layout_search_results(results):
                 value=st.session_state.highlight_matches
             )
 
+        page_cols = st.columns(2)
+        with page_cols[0]:
+            page_size = st.selectbox(
+                "Images per Page",
+                options=PAGE_SIZE_OPTIONS,
+                key="page_size",
+            )
+        num_pages = max(1, -(-len(results) // page_size))
+        # a larger page size can leave the current page past the end
+        st.session_state.results_page = min(st.session_state.results_page, num_pages)
+        with page_cols[1]:
+            page = st.number_input(
+                f"Page (of {num_pages})",
+                min_value=1,
+                max_value=num_pages,
+                key="results_page",
+            )
+        start = (page - 1) * page_size
+        metadata = dataset.metadata
+        page_results = [metadata[i] for i in results[start : start + page_size]]
+
         grid_columns = st.columns(st.session_state.grid_columns)
         col_index = 0
 
         search_parameters = st.session_state.search_parameters
-        for result in results:
+        for result in page_results:
             with grid_columns[col_index]:
                 try:
                     image_path = result["image_path"]
-                    image = Image.open(image_path).convert("RGB")
+                    image_src, (width, height) = thumbnail_src(image_path)
 
+                    # only this markup changes when the display options are
+                    # toggled; the image itself stays cached in the browser
+                    overlay = ""
                     if st.session_state.show_boxes:
-                        image = layout_draw_boxes(
-                            image,
+                        overlay = detections_svg(
                             result.get("detections", []),
-                            st.session_state.search_parameters,
+                            width,
+                            height,
+                            search_parameters,
                             st.session_state.highlight_matches,
                         )
                     meta_items = [f"{k}: {v}" for k, v in result["class_counts"].items()]
 
-                    layout_image_box(image, meta_items=meta_items, image_path=image_path)
+                    layout_image_box(
+                        image_src, overlay, meta_items=meta_items, image_path=image_path
+                    )
 
                     col_index = (col_index + 1) % st.session_state.grid_columns
 
@@ -481,6 +803,14 @@ st.markdown(
     object-fit: cover;
 }}
 
+.image-container .box-overlay {{
+    position: absolute;
+    inset: 0;
+    width: 100%;
+    height: 100%;
+    pointer-events: none;
+}}
+
 .meta-overlay {{
     padding: 10px;
     background: rgba(0,0,0,0.85);
@@ -513,9 +843,10 @@ if main_option == "Process New Images":
 elif main_option == "Load Existing Metadata":
     layout_load_existing_metadata()
 
-if st.session_state.metadata is not None:
-    layout_search_images()
+dataset = current_dataset()
+if dataset is not None:
+    layout_search_images(dataset)
 
-if st.session_state.search_results is not None:
-    results = st.session_state.search_results
-    layout_search_results(results)
+    if st.session_state.search_results is not None:
+        results = st.session_state.search_results
+        layout_search_results(results, dataset)
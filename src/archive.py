@@ -0,0 +1,123 @@
+import zipfile
+from pathlib import Path, PurePosixPath
+
+import cv2
+import numpy as np
+
+from src.incremental import bytes_digest
+
+PERSIST_MODES = ("all", "detections", "none")
+
+
+def decode_image_bytes(data):
+    """Decode encoded image bytes into the BGR array layout ultralytics
+    expects."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Unable to decode image")
+    return image
+
+
+class ZipImageSource:
+    """Feed the images inside a ZIP archive to `YOLOv11Inference` without
+    extracting it.
+
+    Members are read and decoded in memory, so `load` can run on the
+    prefetch thread pool. Every image is addressed by the path it would have
+    if the archive were extracted into `image_dir`; with `persist` set to
+    "all", or to "detections" for images where something was detected, the
+    original bytes are written there after inference so the results grid can
+    display them. `archive` may be a path or a seekable file object such as a
+    Streamlit upload. Members whose names would resolve outside `image_dir`
+    (absolute paths, drive letters or `..` parts) are skipped.
+    """
+
+    def __init__(self, archive, image_dir, extensions, persist="detections"):
+        if persist not in PERSIST_MODES:
+            raise ValueError(f"persist must be one of {PERSIST_MODES}, got {persist!r}")
+        self.zip_file = zipfile.ZipFile(archive, "r")
+        self.image_dir = Path(image_dir)
+        self.persist = persist
+        self._pending = {}  # image path -> bytes, until the record is written
+        self._digests = {}  # image path -> content digest of loaded members
+
+        extensions = tuple(ext.lower() for ext in extensions)
+        self.members = {}  # image path -> ZipInfo
+        for info in self.zip_file.infolist():
+            member = PurePosixPath(info.filename.replace("\\", "/"))
+            if info.is_dir() or "__MACOSX" in member.parts:
+                continue
+            if member.suffix.lower() not in extensions:
+                continue
+            target = self._target(member)
+            if target is not None:
+                self.members[target] = info
+        self.image_paths = sorted(self.members)
+
+    def _target(self, member):
+        """Path of `member` under `image_dir`, or None for names that would
+        escape it."""
+        if member.is_absolute() or ".." in member.parts or ":" in member.parts[0]:
+            return None
+        target = self.image_dir.joinpath(*member.parts)
+        if not self._inside(target):
+            return None
+        return target
+
+    def _inside(self, path):
+        return Path(path).resolve().is_relative_to(self.image_dir.resolve())
+
+    def read(self, image_path):
+        """Encoded bytes of one member, without buffering them."""
+        return self.zip_file.read(self.members[Path(image_path)])
+
+    def load(self, image_path):
+        data = self.read(image_path)
+        self._pending[str(image_path)] = data
+        self._digests[str(image_path)] = bytes_digest(data)
+        return decode_image_bytes(data)
+
+    def fingerprint(self, image_path):
+        """Size and CRC-32 of a member from the archive directory, which
+        identify unchanged images without reading them (see
+        `IncrementalIndex`)."""
+        info = self.members[Path(image_path)]
+        return {"size": info.file_size, "crc": info.CRC}
+
+    def digest(self, image_path):
+        """Content digest of a member (same scheme as `file_digest`), taken
+        from the bytes `load` already read when possible."""
+        digest = self._digests.pop(str(image_path), None)
+        return digest or bytes_digest(self.read(image_path))
+
+    def finish(self, image_paths, metadata, on_bytes=None):
+        """Release the bytes buffered for a processed batch, persisting the
+        ones that are needed later.
+
+        `on_bytes(image_path, data)` is called for every image that produced
+        a record, e.g. to build its thumbnail from memory. Duplicates, whose
+        records were copied rather than inferred, are read on demand.
+        """
+        records = {md["image_path"]: md for md in metadata}
+        for img_path in image_paths:
+            data = self._pending.pop(str(img_path), None)
+            record = records.get(str(img_path))
+            if data is None and record is not None and "duplicate_of" in record:
+                data = self.read(img_path)
+            if data is None or record is None:
+                continue
+            if self.persist == "all" or (
+                self.persist == "detections" and record["detections"]
+            ):
+                img_path = Path(img_path)
+                if not self._inside(img_path):
+                    raise ValueError(f"refusing to write {img_path} outside {self.image_dir}")
+                img_path.parent.mkdir(parents=True, exist_ok=True)
+                img_path.write_bytes(data)
+            if on_bytes is not None:
+                on_bytes(str(img_path), data)
+
+    def close(self):
+        self._pending.clear()
+        self._digests.clear()
+        self.zip_file.close()
@@ -0,0 +1,222 @@
+import argparse
+import json
+import time
+
+from src.incremental import weights_digest
+from src.inference import YOLOv11Inference, _print_error, load_image
+from src.parity import match_detections
+from src.prefetch import prefetch
+
+FAST_STAGE = "fast"
+FULL_STAGE = "full"
+
+
+def cascade_fingerprint(fast_model, margin):
+    """Suffix for `model_fingerprint` so cached detections are invalidated
+    when the fast model or the margin changes."""
+    return f":cascade:{weights_digest(fast_model)}:{margin}"
+
+
+def is_confident(record, conf_threshold, margin):
+    """True when every detection clears `conf_threshold + margin`.
+
+    The fast model predicts with `conf_threshold - margin`, so a detection
+    anywhere inside the margin band around the threshold shows up here and
+    sends the image to the full model.
+    """
+    return all(det["confidence"] >= conf_threshold + margin for det in record["detections"])
+
+
+class CascadeInference:
+    """Run a small model on every image and the full model only on the
+    images the small one is unsure about.
+
+    Wraps the `YOLOv11Inference` of the full model and exposes the same
+    batching interface, so callers can use either. Decoded images are kept
+    only until their escalation batch runs, so nothing is read twice. Every
+    record gets a `stage` field naming the model that produced it. Cascades
+    always run in-process; `parallel.workers` is ignored.
+    """
+
+    def __init__(self, full, fast_model, margin=0.15):
+        self.full = full
+        self.margin = margin
+        self.fast = YOLOv11Inference(fast_model, device=full.device, backend=full.backend)
+        self.fast.conf_threshold = max(full.conf_threshold - margin, 0.01)
+        # one set of stage timings for both models
+        self.fast.timings = full.timings
+        self.escalated = 0
+
+    def __getattr__(self, name):
+        # config, timings, decode_workers, list_image_paths, ... of the full model
+        return getattr(self.full, name)
+
+    def process_batch(self, image_paths, batch_size=None, on_error=None, loader=None):
+        metadata = []
+        for _, batch_metadata in self.iter_batches(
+            image_paths, batch_size, on_error, loader
+        ):
+            metadata.extend(batch_metadata)
+        return metadata
+
+    def iter_batches(self, image_paths, batch_size=None, on_error=None, loader=None):
+        """Yield `(attempted_paths, metadata)` like
+        `YOLOv11Inference.iter_batches`.
+
+        Confident images are yielded with the fast batch that produced them;
+        uncertain ones are yielded later with the full-model batch they were
+        escalated in. Every path is attempted exactly once, and no batch is
+        empty: a fast batch whose images were all escalated yields nothing.
+        """
+        batch_size = batch_size or self.full.batch_size
+        on_error = on_error or _print_error
+        load = loader or load_image
+        timings = self.full.timings
+
+        def timed_load(img_path):
+            with timings.time("read"):
+                return load(img_path)
+
+        def fast_batch(attempted, paths, images):
+            timings.images += len(attempted)
+            records = self.fast._predict_images(paths, images, on_error)
+            accepted, escalated = [], set()
+            # records come back in path order, or not at all if predict failed
+            for img_path, image, record in zip(paths, images, records):
+                if is_confident(record, self.full.conf_threshold, self.margin):
+                    record["stage"] = FAST_STAGE
+                    accepted.append(record)
+                else:
+                    pending.append((img_path, image))
+                    escalated.add(img_path)
+            done = [p for p in attempted if p not in escalated]
+            if done:
+                yield done, accepted
+
+        def full_batch(items):
+            paths = [img_path for img_path, _ in items]
+            self.escalated += len(paths)
+            records = self.full._predict_images(paths, [image for _, image in items], on_error)
+            for record in records:
+                record["stage"] = FULL_STAGE
+            return paths, records
+
+        attempted, paths, images, pending = [], [], [], []
+        decoded = prefetch(
+            image_paths,
+            timed_load,
+            workers=self.full.decode_workers,
+            depth=self.full.prefetch_depth,
+        )
+        for img_path, image, error in decoded:
+            attempted.append(img_path)
+            if error is not None:
+                on_error(img_path, error)
+            else:
+                paths.append(img_path)
+                images.append(image)
+            if len(attempted) == batch_size:
+                yield from fast_batch(attempted, paths, images)
+                attempted, paths, images = [], [], []
+            while len(pending) >= batch_size:
+                yield full_batch(pending[:batch_size])
+                del pending[:batch_size]
+        if attempted:
+            yield from fast_batch(attempted, paths, images)
+        while pending:
+            yield full_batch(pending[:batch_size])
+            del pending[:batch_size]
+
+
+def calibrate(full_model, fast_model, image_paths, margins, device="cpu", iou_threshold=0.5):
+    """Compare cascade output against the full model alone on a sample.
+
+    Both models run once over `image_paths`, the fast one at the lowest
+    threshold any margin needs, and every margin is then evaluated offline:
+    the share of images escalated, how many accepted images disagree with
+    the full model (different per-class counts), the unmatched boxes among
+    them, and the expected time per image relative to the full model.
+    """
+    full = YOLOv11Inference(full_model, device=device)
+    fast = YOLOv11Inference(fast_model, device=device)
+    fast.conf_threshold = max(full.conf_threshold - max(margins), 0.01)
+
+    def run(inference):
+        start = time.perf_counter()
+        records = {md["image_path"]: md for md in inference.process_batch(image_paths)}
+        return records, (time.perf_counter() - start) / max(len(records), 1)
+
+    reference, full_s = run(full)
+    candidate, fast_s = run(fast)
+    images = [img_path for img_path in reference if img_path in candidate]
+
+    margin_reports = []
+    for margin in margins:
+        escalated, disagreements, unmatched = 0, [], 0
+        for img_path in images:
+            # what the fast model would report had it run at this margin
+            record = dict(candidate[img_path])
+            record["detections"] = [
+                det
+                for det in record["detections"]
+                if det["confidence"] >= full.conf_threshold - margin
+            ]
+            if not is_confident(record, full.conf_threshold, margin):
+                escalated += 1
+                continue
+            counts = {}
+            for det in record["detections"]:
+                counts[det["class"]] = counts.get(det["class"], 0) + 1
+            if counts != reference[img_path]["class_counts"]:
+                disagreements.append(img_path)
+            _, leftover = match_detections(
+                reference[img_path]["detections"], record["detections"], iou_threshold
+            )
+            unmatched += leftover
+        escalation_rate = escalated / max(len(images), 1)
+        margin_reports.append(
+            {
+                "margin": margin,
+                "escalation_rate": escalation_rate,
+                "disagreements": len(disagreements),
+                "disagreement_rate": len(disagreements) / max(len(images), 1),
+                "unmatched_boxes": unmatched,
+                "relative_cost": (fast_s + escalation_rate * full_s) / full_s if full_s else None,
+                "disagreeing_images": disagreements,
+            }
+        )
+
+    return {
+        "full_model": full_model,
+        "fast_model": fast_model,
+        "images": len(images),
+        "full_s_per_image": full_s,
+        "fast_s_per_image": fast_s,
+        "margins": margin_reports,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Calibrate the cascade margin against the full model on a sample."
+    )
+    parser.add_argument("full_model")
+    parser.add_argument("fast_model")
+    parser.add_argument("image_dir")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--limit", type=int, default=200, help="number of sample images")
+    parser.add_argument(
+        "--margins", type=float, nargs="+", default=[0.05, 0.1, 0.15, 0.2, 0.3]
+    )
+    args = parser.parse_args()
+
+    paths = YOLOv11Inference(args.full_model, device=args.device).list_image_paths(
+        args.image_dir
+    )
+    # spread the sample over the whole directory rather than its first files
+    step = max(len(paths) // args.limit, 1)
+    sample = paths[::step][: args.limit]
+    report = calibrate(
+        args.full_model, args.fast_model, sample, sorted(args.margins), device=args.device
+    )
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,276 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.utils import load_metadata
+
+# Per-image keys that are derived from the detections and therefore not
+# stored in the image table.
+DERIVED_KEYS = ("detections", "total_objects", "unique_class", "class_counts")
+
+
+class ColumnarMetadata:
+    """Metadata stored as flat typed arrays instead of nested dicts.
+
+    Detections are sorted by image and kept as parallel arrays: `image_id`
+    (int32), `class_id` (int16, index into `class_names`), `confidence`
+    (float32) and `bbox` (float32, N x 4 as [x1, y1, x2, y2]). `offsets`
+    (int64, one entry per image plus one) gives each image's slice of those
+    arrays. Per-image fields such as `image_path` live in the `images` table,
+    one list per field.
+
+    Saved as a directory of `.npy` files plus two small JSON tables, so
+    `load` can memory-map the arrays rather than parsing them. The object
+    also behaves like the usual list of metadata dicts (`len`, indexing,
+    iteration), building each dict on demand.
+    """
+
+    def __init__(self, images, class_names, image_id, class_id, confidence, bbox, offsets):
+        self.images = images
+        self.class_names = class_names
+        self.image_id = image_id
+        self.class_id = class_id
+        self.confidence = confidence
+        self.bbox = bbox
+        self.offsets = offsets
+        self._areas = None
+        self._aspects = None
+        self._normalized = None
+
+    @classmethod
+    def from_records(cls, metadata):
+        """Build from the list-of-dicts layout written by `save_metadata`."""
+        class_ids = {}
+        images = {"image_path": []}
+        image_id, class_id, confidence, bbox = [], [], [], []
+        offsets = [0]
+
+        for idx, item in enumerate(metadata):
+            for key, value in item.items():
+                if key in DERIVED_KEYS:
+                    continue
+                # fields missing from earlier records are back-filled with None
+                images.setdefault(key, [None] * idx).append(value)
+            for key, column in images.items():
+                if len(column) == idx:
+                    column.append(None)
+
+            for det in item.get("detections", []):
+                image_id.append(idx)
+                class_id.append(class_ids.setdefault(det["class"], len(class_ids)))
+                confidence.append(det["confidence"])
+                bbox.append(det["bbox"])
+            offsets.append(len(image_id))
+
+        return cls(
+            images=images,
+            class_names=list(class_ids),
+            image_id=np.asarray(image_id, dtype=np.int32),
+            class_id=np.asarray(class_id, dtype=np.int16),
+            confidence=np.asarray(confidence, dtype=np.float32),
+            bbox=np.asarray(bbox, dtype=np.float32).reshape(-1, 4),
+            offsets=np.asarray(offsets, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_json(cls, metadata_path):
+        return cls.from_records(load_metadata(metadata_path))
+
+    def save(self, directory):
+        """Write the store to `directory` and return its path.
+
+        The files are written to a temporary sibling that then replaces
+        `directory` by rename. An existing store is never rewritten in place:
+        its files are unlinked, so anyone who still has them memory-mapped
+        keeps reading the old contents instead of a truncated file.
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = directory.with_name(
+            f"{directory.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        tmp_dir.mkdir()
+        try:
+            for name in ("image_id", "class_id", "confidence", "bbox", "offsets"):
+                np.save(tmp_dir / f"{name}.npy", getattr(self, name))
+            with open(tmp_dir / "images.json", "w") as f:
+                json.dump(self.images, f)
+            with open(tmp_dir / "classes.json", "w") as f:
+                json.dump(self.class_names, f)
+            while True:
+                try:
+                    os.rename(tmp_dir, directory)
+                    break
+                except OSError:
+                    if not directory.is_dir():
+                        raise
+                # move the previous store aside; retried if another writer
+                # puts one back in between
+                old_dir = Path(tempfile.mkdtemp(dir=directory.parent, prefix=f"{directory.name}."))
+                try:
+                    os.rename(directory, old_dir / "old")
+                except FileNotFoundError:
+                    pass
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a store written by `save`, memory-mapping the arrays unless
+        `mmap` is False."""
+        directory = Path(directory)
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ("image_id", "class_id", "confidence", "bbox", "offsets")
+        }
+        with open(directory / "images.json", "r") as f:
+            images = json.load(f)
+        with open(directory / "classes.json", "r") as f:
+            class_names = json.load(f)
+        return cls(images=images, class_names=class_names, **arrays)
+
+    def to_json(self, metadata_path):
+        """Export in the `metadata.json` layout."""
+        with open(metadata_path, "w") as f:
+            json.dump(self.to_records(), f, indent=4)
+        return metadata_path
+
+    def to_records(self):
+        return list(self)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, stop = int(self.offsets[idx]), int(self.offsets[idx + 1])
+
+        names = [self.class_names[c] for c in self.class_id[start:stop].tolist()]
+        class_counts = {}
+        for name in names:
+            class_counts[name] = class_counts.get(name, 0) + 1
+        detections = [
+            {"class": name, "confidence": conf, "bbox": bbox, "count": class_counts[name]}
+            for name, conf, bbox in zip(
+                names,
+                self.confidence[start:stop].tolist(),
+                self.bbox[start:stop].tolist(),
+            )
+        ]
+
+        # None marks a field the original record did not have
+        record = {
+            key: column[idx]
+            for key, column in self.images.items()
+            if column[idx] is not None
+        }
+        record.update(
+            {
+                "detections": detections,
+                "total_objects": len(detections),
+                "unique_class": list(class_counts.keys()),
+                "class_counts": class_counts,
+            }
+        )
+        return record
+
+    def box_areas(self):
+        """Box areas in square pixels, computed once."""
+        if self._areas is None:
+            width = self.bbox[:, 2] - self.bbox[:, 0]
+            height = self.bbox[:, 3] - self.bbox[:, 1]
+            self._areas = width * height
+        return self._areas
+
+    def box_aspects(self):
+        """Box aspect ratios (width / height), computed once."""
+        if self._aspects is None:
+            width = self.bbox[:, 2] - self.bbox[:, 0]
+            height = self.bbox[:, 3] - self.bbox[:, 1]
+            self._aspects = np.divide(
+                width,
+                height,
+                out=np.full_like(width, np.inf),
+                where=height > 0,
+            )
+        return self._aspects
+
+    def image_sizes(self):
+        """`(width, height)` float arrays per image; NaN where the metadata
+        predates image sizes being recorded."""
+        sizes = []
+        for key in ("width", "height"):
+            column = self.images.get(key, [None] * len(self))
+            sizes.append(
+                np.array([np.nan if v is None else v for v in column], dtype=np.float32)
+            )
+        return tuple(sizes)
+
+    def normalized_boxes(self):
+        """Boxes divided by their image's width/height, computed once."""
+        if self._normalized is None:
+            width, height = self.image_sizes()
+            scale = np.stack(
+                [width[self.image_id], height[self.image_id]] * 2, axis=1
+            )
+            self._normalized = self.bbox / scale
+        return self._normalized
+
+    def pair_counts(self):
+        """Return `(image_ids, class_ids, counts)` with one entry per distinct
+        (image, class) pair, sorted by image then class."""
+        num_classes = max(len(self.class_names), 1)
+        keys = self.image_id.astype(np.int64) * num_classes + self.class_id
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys // num_classes, keys % num_classes, counts
+
+    def class_postings(self):
+        """Return `{class: (image_ids, counts)}` with sorted int32 arrays,
+        the posting lists used by `SearchIndex`."""
+        image_ids, class_ids, counts = self.pair_counts()
+        postings = {}
+        for cid, name in enumerate(self.class_names):
+            selected = class_ids == cid
+            postings[name] = (
+                image_ids[selected].astype(np.int32),
+                counts[selected].astype(np.int32),
+            )
+        return postings
+
+    def unique_classes(self):
+        """Vectorized equivalent of `utils.get_unique_classes`."""
+        _, class_ids, counts = self.pair_counts()
+        count_options = {}
+        for cid, name in enumerate(self.class_names):
+            options = np.unique(counts[class_ids == cid])
+            if len(options):
+                count_options[name] = options.tolist()
+        return sorted(count_options), count_options
+
+
+if __name__ == "__main__":
+    # python -m src.columnar metadata.json out_dir   (JSON -> columnar)
+    # python -m src.columnar out_dir metadata.json   (columnar -> JSON)
+    source, target = Path(sys.argv[1]), Path(sys.argv[2])
+    if source.is_dir():
+        ColumnarMetadata.load(source).to_json(target)
+    else:
+        ColumnarMetadata.from_json(source).save(target)
+    print(f"Wrote {target}")
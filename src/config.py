@@ -1,13 +1,24 @@
+import copy
+import os
 import yaml
 from pathlib import Path
 
+_cache = {}
+
 def load_config(config_path="configs/default.yaml"):
 		"""
 		Load configuration from a YAML file.
+
+		Parsed files are cached per path and re-read only when their mtime
+		changes; callers get their own copy.
 		"""
-		with open(Path(config_path), 'r') as file:
-				config = yaml.safe_load(file)
-		return config
+		mtime = os.stat(config_path).st_mtime_ns
+		cached = _cache.get(str(config_path))
+		if cached is None or cached[0] != mtime:
+				with open(Path(config_path), 'r') as file:
+						config = yaml.safe_load(file)
+				cached = _cache[str(config_path)] = (mtime, config)
+		return copy.deepcopy(cached[1])
 
 def save_config(config, config_path="configs/default.yaml"):
 		"""
@@ -0,0 +1,170 @@
+import copy
+import hashlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.prefetch import prefetch
+
+# dHash compares 9x8 grayscale neighbours, giving a 64-bit hash
+HASH_WIDTH, HASH_HEIGHT = 9, 8
+
+# set bits per byte value, for Hamming distances without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def signature(data):
+    """Return `(exact_digest, gray, (width, height))` for encoded image bytes.
+
+    `gray` is the 9x8 grayscale thumbnail the dHash is computed from. The
+    size is taken from the decoded array, which OpenCV rotates by the EXIF
+    orientation just as `load_image` does, so it matches the `width` and
+    `height` inference records for the same file.
+    """
+    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+    gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Unable to decode image")
+    size = (gray.shape[1], gray.shape[0])
+    gray = cv2.resize(gray, (HASH_WIDTH, HASH_HEIGHT), interpolation=cv2.INTER_AREA)
+    return digest, gray, size
+
+
+def dhash(grays):
+    """Vectorized dHash of a `(n, 8, 9)` stack of grayscale thumbnails;
+    returns `n` uint64 hashes."""
+    grays = np.asarray(grays, dtype=np.int16)
+    bits = grays[:, :, 1:] > grays[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(grays), -1), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+
+def hamming(a, b):
+    """Element-wise Hamming distance between broadcastable uint64 arrays."""
+    xor = np.bitwise_xor(a, b)
+    return _POPCOUNT[xor[..., None].view(np.uint8)].sum(axis=-1)
+
+
+def _add_leader(table, key, index, value):
+    # per band value, the canonical indices and hashes in growable arrays
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = [np.empty(4, dtype=np.int64), np.empty(4, dtype=np.uint64), 0]
+    indices, values, count = entry
+    if count == len(indices):
+        entry[0] = indices = np.resize(indices, 2 * count)
+        entry[1] = values = np.resize(values, 2 * count)
+    indices[count] = index
+    values[count] = value
+    entry[2] = count + 1
+
+
+def group_hashes(hashes, threshold):
+    """Leader clustering of images whose hashes are within `threshold` bits.
+
+    Images are visited in order. Each one joins the nearest earlier
+    canonical image (the earliest on ties) within `threshold` bits of its
+    own hash, or becomes canonical itself, so every image is close to the
+    image its detections are copied from; a slowly drifting burst is split
+    rather than chained onto its first frame.
+
+    Candidate canonicals come from banded LSH: with the 64 bits split into
+    `threshold + 1` bands, two hashes within `threshold` bits agree exactly
+    on at least one band, so an image is only compared with the canonical
+    images sharing one of its band values, one image at a time. Returns the
+    canonical index of every image.
+    """
+    n = len(hashes)
+    canonical = np.arange(n)
+    bands = min(threshold + 1, 64)
+    edges = np.linspace(0, 64, bands + 1).astype(np.uint64)
+    band_keys = [
+        ((hashes >> low) & np.uint64((1 << int(high - low)) - 1)).tolist()
+        for low, high in zip(edges[:-1], edges[1:])
+    ]
+    tables = [{} for _ in range(bands)]  # band value -> canonical images
+    seen = {}  # hash -> canonical index, so repeated hashes skip the search
+    for i, value in enumerate(hashes.tolist()):
+        if value in seen:
+            canonical[i] = seen[value]
+            continue
+        entries = [table.get(keys[i]) for keys, table in zip(band_keys, tables)]
+        entries = [entry for entry in entries if entry is not None]
+        if entries:
+            indices = np.concatenate([entry[0][: entry[2]] for entry in entries])
+            distances = hamming(
+                np.concatenate([entry[1][: entry[2]] for entry in entries]), hashes[i]
+            )
+            nearest = distances.min()
+            if nearest <= threshold:
+                canonical[i] = seen[value] = indices[distances == nearest].min()
+                continue
+        seen[value] = i
+        for keys, table in zip(band_keys, tables):
+            _add_leader(table, keys[i], i, hashes[i])
+    return canonical
+
+
+def find_duplicates(image_paths, read=None, threshold=4, workers=4, depth=16):
+    """Group exact and near-duplicate images.
+
+    Returns `{duplicate_path: (canonical_path, (width, height))}` keyed by
+    `str` paths, where the canonical image is the first of its group in
+    `image_paths` order and the size is the duplicate's own, or None for an
+    exact copy of the canonical image, whose boxes apply as they are. Exact
+    copies (same bytes) are always grouped; other images join a canonical
+    image whose dHash differs from their own by at most `threshold` bits
+    (see `group_hashes`). `read(path)` returns the encoded bytes (files are
+    read from disk by default); images that cannot be read or decoded are
+    left out and fail later in inference as usual.
+    """
+    read = read or (lambda path: Path(path).read_bytes())
+    paths, digests, grays, sizes = [], [], [], []
+    for path, value, error in prefetch(
+        image_paths, lambda path: signature(read(path)), workers=workers, depth=depth
+    ):
+        if error is not None:
+            continue
+        paths.append(str(path))
+        digests.append(value[0])
+        grays.append(value[1])
+        sizes.append(value[2])
+    if not paths:
+        return {}
+
+    hashes = dhash(np.stack(grays))
+    # exact copies collapse onto one hash first, so they always share the
+    # canonical image of their first occurrence
+    first_with_digest = {}
+    for i, digest in enumerate(digests):
+        j = first_with_digest.setdefault(digest, i)
+        hashes[i] = hashes[j]
+    canonical = group_hashes(hashes, threshold)
+
+    return {
+        paths[i]: (paths[c], None if digests[i] == digests[c] else sizes[i])
+        for i, c in enumerate(canonical)
+        if c != i
+    }
+
+
+def duplicate_record(record, image_path, size=None):
+    """Copy the detections of `record` (the canonical image) for one of its
+    duplicates, linking back to the canonical image with `duplicate_of`.
+
+    Boxes are rescaled when the duplicate has a different resolution, e.g. a
+    re-exported copy.
+    """
+    duplicate = copy.deepcopy(record)
+    duplicate["image_path"] = str(image_path)
+    duplicate["duplicate_of"] = record["image_path"]
+    if size is not None and record.get("width"):
+        sx = size[0] / record["width"]
+        sy = size[1] / record["height"]
+        if (sx, sy) != (1.0, 1.0):
+            for detection in duplicate["detections"]:
+                x1, y1, x2, y2 = detection["bbox"]
+                detection["bbox"] = [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
+        duplicate["width"], duplicate["height"] = size
+    return duplicate
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from src.utils import ensure_dir_exists, load_metadata
+
+FINGERPRINTS_FILE = "fingerprints.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the hex BLAKE2b digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_digest(data):
+    """`file_digest` of contents already in memory, e.g. a ZIP member."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+_weights_digests = {}
+
+
+def weights_digest(weights_path):
+    """`file_digest` for model weights, memoized on path, size and mtime so
+    repeated jobs do not re-hash the same file.
+
+    A bare release name such as `yolo11n.pt` that ultralytics has not
+    downloaded yet is fingerprinted by its name instead.
+    """
+    try:
+        stat = os.stat(weights_path)
+    except FileNotFoundError:
+        return f"name:{os.path.basename(weights_path)}"
+    key = (os.path.abspath(weights_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _weights_digests:
+        _weights_digests[key] = file_digest(weights_path)
+    return _weights_digests[key]
+
+
+def model_fingerprint(weights_path, conf_threshold, backend="torch"):
+    """Fingerprint the detector: any change to the weights, the confidence
+    threshold or the inference backend invalidates every cached detection."""
+    fingerprint = f"{weights_digest(weights_path)}:{conf_threshold}"
+    if backend != "torch":
+        fingerprint += f":{backend}"
+    return fingerprint
+
+
+def image_fingerprint(image_path, digest=None):
+    stat = os.stat(image_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest or file_digest(image_path),
+    }
+
+
+class IncrementalIndex:
+    """Reuse detections from a previous run over the same image directory.
+
+    Images are keyed by their path relative to `image_dir`. An image counts as
+    unchanged when its size and mtime match the stored fingerprint, or, if
+    those moved, when its content hash still does. Fingerprints live in
+    `fingerprints.json` next to `metadata.json`, which keeps its usual layout.
+
+    With a `source` such as `src.archive.ZipImageSource`, images are archive
+    members addressed under `image_dir` and count as unchanged when the size
+    and CRC-32 recorded in the archive match.
+    """
+
+    def __init__(self, image_dir, model_fp, source=None):
+        self.image_dir = Path(image_dir)
+        self.model_fp = model_fp
+        self.source = source
+        self.processed_path = ensure_dir_exists(image_dir)
+        self.fingerprints = {}
+        self.records = {}
+        self._reused = set()
+        self._load()
+
+    def _load(self):
+        fingerprints_path = self.processed_path / FINGERPRINTS_FILE
+        metadata_path = self.processed_path / "metadata.json"
+        if not (fingerprints_path.exists() and metadata_path.exists()):
+            return
+        with open(fingerprints_path, "r") as f:
+            stored = json.load(f)
+        if stored.get("model") != self.model_fp:
+            return
+        self.fingerprints = stored.get("images", {})
+        for item in load_metadata(metadata_path):
+            self.records[self._key(item["image_path"])] = item
+
+    def _key(self, image_path):
+        path = Path(image_path)
+        try:
+            path = path.relative_to(self.image_dir)
+        except ValueError:
+            pass
+        return path.as_posix()
+
+    def partition(self, image_paths):
+        """Split `image_paths` into cached records and paths that still need
+        inference.
+
+        Returns `(cached, todo)` where `cached` maps each unchanged path to its
+        previous metadata dict (with `image_path` updated) and `todo` lists
+        the new or changed paths in input order.
+        """
+        cached, todo = {}, []
+        for img_path in image_paths:
+            key = self._key(img_path)
+            record = self.records.get(key)
+            stored = self.fingerprints.get(key)
+            if record is None or stored is None or not self._unchanged(img_path, key, stored):
+                todo.append(img_path)
+                continue
+            cached[img_path] = dict(record, image_path=str(img_path))
+            self._reused.add(key)
+        return cached, todo
+
+    def digest(self, image_path):
+        """Content digest stored for an image, or None if it has none."""
+        fingerprint = self.fingerprints.get(self._key(image_path))
+        return fingerprint["hash"] if fingerprint else None
+
+    def _unchanged(self, img_path, key, stored):
+        if self.source is not None:
+            fingerprint = self.source.fingerprint(img_path)
+            return all(stored.get(name) == value for name, value in fingerprint.items())
+        stat = os.stat(img_path)
+        if stat.st_size == stored["size"] and stat.st_mtime_ns == stored["mtime_ns"]:
+            return True
+        if stat.st_size != stored["size"]:
+            return False
+        # touched but possibly identical: fall back to the content hash
+        fingerprint = image_fingerprint(img_path)
+        if fingerprint["hash"] != stored["hash"]:
+            return False
+        self.fingerprints[key] = fingerprint
+        return True
+
+    def save(self, image_paths, digests=None):
+        """Record fingerprints for every image in `image_paths`, dropping
+        entries for images that are no longer part of the index.
+
+        `digests` maps image paths to content digests that are already known
+        (e.g. from the metadata log), so those files are not hashed again.
+        """
+        digests = digests or {}
+        fingerprints = {}
+        for img_path in image_paths:
+            key = self._key(img_path)
+            if key in self._reused:
+                fingerprints[key] = self.fingerprints[key]
+            elif self.source is not None:
+                fingerprints[key] = dict(
+                    self.source.fingerprint(img_path),
+                    hash=digests.get(str(img_path)) or self.source.digest(img_path),
+                )
+            else:
+                fingerprints[key] = image_fingerprint(img_path, digests.get(str(img_path)))
+        self.fingerprints = fingerprints
+
+        output_path = self.processed_path / FINGERPRINTS_FILE
+        with open(output_path, "w") as f:
+            json.dump({"model": self.model_fp, "images": fingerprints}, f)
+        return output_path
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.columnar import ColumnarMetadata
+from src.incremental import file_digest
+from src.search_index import SearchCache, SearchIndex
+
+COLUMNAR_FILES = ("image_id", "class_id", "confidence", "bbox", "offsets", "images", "classes")
+
+
+class Dataset:
+    """One loaded metadata set: the memory-mapped `ColumnarMetadata`, its
+    `SearchIndex`, the class options for the search form and a cache of
+    recent query results. Shared read-only by every session."""
+
+    def __init__(self, key, metadata, search_cache_size=64):
+        self.key = key
+        self.metadata = metadata
+        self.index = SearchIndex(metadata)
+        self.unique_classes, self.count_options = metadata.unique_classes()
+        self.search_cache = SearchCache(search_cache_size)
+
+    def search(self, search_parameters):
+        """Image ids matching the query, as a shared read-only array."""
+        return self.search_cache.search(self.index, search_parameters)
+
+
+class IndexRegistry:
+    """Process-wide registry of `Dataset`s keyed by metadata content.
+
+    A `metadata.json` is identified by its BLAKE2b digest, so every session
+    that loads the same file, whatever its path or upload, gets the same
+    instance. The JSON is parsed and converted to a columnar store under
+    `cache_dir/<digest>` only the first time it is seen. After that, and for
+    columnar directories passed in directly, the arrays are memory-mapped
+    read-only, so the page cache holds them once for all sessions and
+    processes. At most `max_datasets` stay open, least recently used first
+    out; sessions still holding an evicted one keep it alive until they
+    move on.
+    """
+
+    def __init__(self, cache_dir="data/index", max_datasets=4, search_cache_size=64):
+        self.cache_dir = Path(cache_dir)
+        self.max_datasets = max_datasets
+        self.search_cache_size = search_cache_size
+        self._lock = threading.Lock()
+        self._datasets = OrderedDict()  # key -> Dataset
+        self._building = {}  # key -> lock held while the dataset is opened
+        self._digests = {}  # (path, size, mtime) -> key
+
+    def get(self, metadata_path, records=None):
+        """Return the `Dataset` for a `metadata.json` or a columnar directory.
+
+        `records` may pass the already-parsed contents of a JSON file, as
+        records or as the `ColumnarMetadata` built from them right after
+        ingestion, so a first conversion does not parse or convert it again.
+        """
+        key = self.key(metadata_path)
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+            building = self._building.setdefault(key, threading.Lock())
+
+        # one session opens a dataset while the others wait for it, without
+        # blocking lookups of datasets that are already open
+        with building:
+            with self._lock:
+                if key in self._datasets:
+                    return self._datasets[key]
+            dataset = Dataset(
+                key, self._open(key, metadata_path, records), self.search_cache_size
+            )
+            with self._lock:
+                self._datasets[key] = dataset
+                self._building.pop(key, None)
+                while len(self._datasets) > self.max_datasets:
+                    self._datasets.popitem(last=False)
+        return dataset
+
+    def key(self, metadata_path):
+        """Content digest of a JSON file; columnar directories, which are
+        opened in place, are keyed by their path and file stats instead.
+        Memoized on path, size and mtime so repeat lookups do not re-hash."""
+        path = Path(metadata_path).resolve()
+        if path.is_dir():
+            stats = [os.stat(path / self._columnar_file(name)) for name in COLUMNAR_FILES]
+            return "columnar:" + _text_digest(
+                f"{path}:" + ",".join(f"{s.st_size}:{s.st_mtime_ns}" for s in stats)
+            )
+        stat = os.stat(path)
+        memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if memo_key in self._digests:
+                return self._digests[memo_key]
+        key = file_digest(path)
+        with self._lock:
+            self._digests[memo_key] = key
+        return key
+
+    def _open(self, key, metadata_path, records):
+        if key.startswith("columnar:"):
+            return ColumnarMetadata.load(metadata_path, mmap=True)
+        directory = self.cache_dir / key
+        if not directory.is_dir():
+            if isinstance(records, ColumnarMetadata):
+                metadata = records
+            elif records is not None:
+                metadata = ColumnarMetadata.from_records(records)
+            else:
+                metadata = ColumnarMetadata.from_json(metadata_path)
+            # write aside and rename, so another process never maps a
+            # half-written store
+            tmp_dir = self.cache_dir / f"{key}.{os.getpid()}.tmp"
+            metadata.save(tmp_dir)
+            try:
+                os.rename(tmp_dir, directory)
+            except OSError:
+                # another process finished the same conversion first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        return ColumnarMetadata.load(directory, mmap=True)
+
+    @staticmethod
+    def _columnar_file(name):
+        return f"{name}.json" if name in ("images", "classes") else f"{name}.npy"
+
+
+def _text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
@@ -1,70 +1,235 @@
-from ultralytics import YOLO
 from pathlib import Path
 import torch
+import cv2
 from PIL import Image
 import numpy as np
 from src.config import load_config
+from src.utils import iter_image_paths
+from src.prefetch import prefetch
+from src.parallel import iter_parallel_batches
+from src.model_registry import get_model
+from src.profiling import StageTimings
+
+
+def load_image(image_path):
+    """Decode an image file into the BGR array layout ultralytics expects."""
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise ValueError(f"Unable to read image {image_path}")
+    return image
+
+
+def _print_error(image_path, error):
+    print(f"Error processing {image_path}: {error}")
 
 
 class YOLOv11Inference:
 
-    def __init__(self, model_name, device="cuda"):
+    def __init__(self, model_name, device="cuda", backend=None):
 
-        self.model = YOLO(model_name)
-        self.model.to(device)
+        self.model_name = model_name
         self.device = device
+        self._model = None
+        self._predict_lock = None
+        self.timings = StageTimings()
 
         self.config = load_config()
         self.conf_threshold = self.config["model"]["conf_threshold"]
+        self.batch_size = self.config["model"].get("batch_size", 8)
         self.extensions = self.config["data"]["image_extensions"]
+        self.prefetch_depth = self.config["data"].get("prefetch_depth", 16)
+        self.decode_workers = self.config["data"].get("decode_workers", 4)
+
+        self.model_cache_size = self.config["model"].get("cache_size", 2)
+        self.warmup = self.config["model"].get("warmup", True)
+        self.backend = backend or self.config["model"].get("backend", "torch")
+        self.int8 = self.config["model"].get("int8", False)
+
+        parallel = self.config.get("parallel", {})
+        self.workers = parallel.get("workers", 1)
+        self.threads_per_worker = parallel.get("threads_per_worker", 1)
+        self.shard_size = parallel.get("shard_size", 64)
+
+    @property
+    def model(self):
+        # Loaded on first use so a parallel run never loads the weights in the
+        # parent process, and shared with every other instance in the process
+        # that uses the same weights and device.
+        if self._model is None:
+            self._model, self._predict_lock = get_model(
+                self.model_name,
+                self.device,
+                max_models=self.model_cache_size,
+                warmup=self.warmup,
+                backend=self.backend,
+                int8=self.int8,
+            )
+        return self._model
 
     def process_image(self, image_path):
-        results = self.model.predict(
-            source=str(image_path),
-            conf=self.conf_threshold,
-            device=self.device,
-            save=False,
+        model = self.model
+        with self._predict_lock:
+            results = model.predict(
+                source=str(image_path),
+                conf=self.conf_threshold,
+                device=self.device,
+                save=False,
+            )
+        return self._timed_metadata(image_path, results[0])
+
+    def process_batch(self, image_paths, batch_size=None, on_error=None, loader=None):
+        """Run inference on `image_paths`, sending `batch_size` decoded images
+        through each `predict` call.
+
+        Returns one metadata dict per successfully processed image (same
+        layout as `process_image`), in input order. Images that fail to load
+        or predict are passed to `on_error(path, exc)` and skipped.
+        """
+        metadata = []
+        for _, batch_metadata in self.iter_batches(
+            image_paths, batch_size, on_error, loader
+        ):
+            metadata.extend(batch_metadata)
+        return metadata
+
+    def iter_batches(self, image_paths, batch_size=None, on_error=None, loader=None):
+        """Yield `(attempted_paths, metadata)` for each batch of `image_paths`.
+
+        Images are read and decoded on a background thread pool up to
+        `prefetch_depth` images ahead of the model, so disk I/O overlaps with
+        inference. `attempted_paths` includes images that failed, which lets
+        callers report progress against the full input list.
+
+        `loader(path)` returns the decoded image for a path and defaults to
+        reading it from disk; sources such as `src.archive.ZipImageSource`
+        pass their own.
+
+        With `parallel.workers` > 1 the paths are sharded across worker
+        processes instead (see `src.parallel`) and one item is yielded per
+        shard; workers batch their shard by `batch_size` as well. Custom
+        loaders always run in-process.
+        """
+        batch_size = batch_size or self.batch_size
+        on_error = on_error or _print_error
+
+        if self.workers > 1 and loader is None:
+            yield from iter_parallel_batches(
+                self.model_name,
+                image_paths,
+                workers=self.workers,
+                threads_per_worker=self.threads_per_worker,
+                device=self.device,
+                backend=self.backend,
+                shard_size=self.shard_size,
+                batch_size=batch_size,
+                on_error=on_error,
+                timings=self.timings,
+            )
+            return
+
+        load = loader or load_image
+
+        def timed_load(img_path):
+            # runs on the prefetch threads
+            with self.timings.time("read"):
+                return load(img_path)
+
+        attempted, paths, images = [], [], []
+        decoded = prefetch(
+            image_paths,
+            timed_load,
+            workers=self.decode_workers,
+            depth=self.prefetch_depth,
         )
-        # process the results
-        detections = []
-        class_counts = {}
+        for img_path, image, error in decoded:
+            attempted.append(img_path)
+            if error is not None:
+                on_error(img_path, error)
+            else:
+                paths.append(img_path)
+                images.append(image)
+            if len(attempted) == batch_size:
+                self.timings.images += len(attempted)
+                yield attempted, self._predict_images(paths, images, on_error)
+                attempted, paths, images = [], [], []
+        if attempted:
+            self.timings.images += len(attempted)
+            yield attempted, self._predict_images(paths, images, on_error)
 
-        for result in results:
-            for box in result.boxes:
-                cls = result.names[int(box.cls)]
-                conf = float(box.conf)
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                detections.append(
-                    {"class": cls, "confidence": conf, "bbox": bbox, "count": 1}  # car
+    def _predict_images(self, paths, images, on_error):
+        if not images:
+            return []
+        try:
+            model = self.model
+            with self._predict_lock:
+                results = model.predict(
+                    source=images,
+                    conf=self.conf_threshold,
+                    device=self.device,
+                    save=False,
+                    batch=len(images),
                 )
-                # Update class count
-                class_counts[cls] = class_counts.get(cls, 0) + 1
+        except Exception as e:
+            for img_path in paths:
+                on_error(img_path, e)
+            return []
+        return [
+            self._timed_metadata(img_path, result)
+            for img_path, result in zip(paths, results)
+        ]
 
-        # Update counts in detections
-        for det in detections:
-            det["count"] = class_counts[det["class"]]
+    def _timed_metadata(self, image_path, result):
+        self.timings.add_speed(result.speed)
+        with self.timings.time("build"):
+            return self._build_metadata(image_path, [result])
+
+    def _build_metadata(self, image_path, results):
+        # move cls/conf/xyxy to NumPy once per result instead of converting
+        # box by box
+        names = {}
+        height = width = None
+        cls_ids, confidences, bboxes = [np.zeros(0, dtype=np.intp)], [], []
+        for result in results:
+            boxes = result.boxes.cpu().numpy()
+            names = result.names
+            height, width = result.orig_shape
+            cls_ids.append(boxes.cls.astype(np.intp))
+            confidences.extend(boxes.conf.tolist())
+            bboxes.extend(boxes.xyxy.tolist())  # [x1, y1, x2, y2]
+        cls_ids = np.concatenate(cls_ids)
+
+        counts = np.bincount(cls_ids, minlength=len(names))
+        # classes keep the order in which they were first detected
+        _, first_seen = np.unique(cls_ids, return_index=True)
+        class_counts = {  # {"car": 3, "person": 5}
+            names[c]: int(counts[c]) for c in cls_ids[np.sort(first_seen)].tolist()
+        }
+
+        detections = [
+            {"class": names[c], "confidence": conf, "bbox": bbox, "count": int(counts[c])}
+            for c, conf, bbox in zip(cls_ids.tolist(), confidences, bboxes)
+        ]
 
         return {
             "image_path": str(image_path),
+            # needed to normalize boxes for region queries
+            "width": width,
+            "height": height,
             "detections": detections,
             "total_objects": len(detections),
             "unique_class": list(class_counts.keys()),  # [0,1,2]
-            "class_counts": class_counts,  # {"car": 3, "person": 5}
+            "class_counts": class_counts,
         }
 
     def process_directory(self, directory):
-        metadata = []
-        patterns = [f"*{ext}" for ext in self.extensions]
-        image_paths = []
-        for pattern in patterns:
-            image_paths.extend(Path(directory).glob(pattern))
-        for img_path in image_paths:
-            try:
-                metadata.append(self.process_image(img_path))
-            except Exception as e:
-                print(f"Error processing {img_path}: {e}")
-                continue
-        return metadata
+        # stream paths straight into the batches so inference starts right away
+        return self.process_batch(self.iter_image_paths(directory, recursive=False))
+
+    def iter_image_paths(self, directory, recursive=True, sort=True):
+        """Yield image paths in `directory` matching the configured
+        extensions (case-insensitively) as they are found; see
+        `src.utils.iter_image_paths`."""
+        return iter_image_paths(directory, self.extensions, recursive, sort)
 
     def list_image_paths(self, directory):
         """Return a sorted list of image Path objects in `directory` matching
@@ -75,8 +240,4 @@ class YOLOv11Inference:
         """
         # Use recursive search so images inside subdirectories (e.g. from a ZIP)
         # are also discovered.
-        patterns = [f"*{ext}" for ext in self.extensions]
-        image_paths = []
-        for pattern in patterns:
-            image_paths.extend(Path(directory).rglob(pattern))
-        return sorted(image_paths)
+        return list(self.iter_image_paths(directory))
@@ -0,0 +1,131 @@
+import json
+import os
+from pathlib import Path
+
+# bumped whenever the line layout changes, so older logs are not resumed
+LOG_FORMAT = 2
+
+
+class MetadataLog:
+    """Append-only JSON Lines log of metadata records written during ingestion.
+
+    Every record is appended as soon as it is produced, together with the
+    content digest of its image, and the file is fsync'ed every
+    `fsync_every` records, so a crash loses at most the last few images. The
+    first line is a header holding `key` (e.g. the model fingerprint); an
+    existing log written under a different key is discarded instead of
+    resumed. A logged record is only reused for an image whose content
+    still has the same digest (`is_committed`), so a re-upload that reuses
+    file names is processed again. `compact` turns the log into the usual
+    `metadata.json` layout.
+    """
+
+    def __init__(self, path, key=None, fsync_every=64):
+        self.path = Path(path)
+        self.key = key
+        self.fsync_every = fsync_every
+        self._pending = 0
+        self.committed = self._recover()
+        self._file = open(self.path, "a")
+        if self.path.stat().st_size == 0:
+            self._write_line({"log_key": key, "format": LOG_FORMAT})
+
+    def _recover(self):
+        """Index the records already on disk as `{image_path: (offset,
+        digest)}` and cut off a trailing partial line left by a crash."""
+        committed = {}
+        if not self.path.exists():
+            return committed
+        good_size = 0
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            try:
+                header = json.loads(header) if header.endswith(b"\n") else {}
+                valid = header["log_key"] == self.key and header.get("format") == LOG_FORMAT
+            except (ValueError, KeyError):
+                valid = False
+            if not valid:
+                # different model, older layout or unreadable log: start over
+                self.path.unlink()
+                return committed
+            good_size = f.tell()
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                committed[entry["record"]["image_path"]] = (good_size, entry["digest"])
+                good_size = f.tell()
+        with open(self.path, "r+b") as f:
+            f.truncate(good_size)
+        return committed
+
+    def _write_line(self, obj):
+        self._file.write(json.dumps(obj) + "\n")
+
+    def append(self, record, digest=None):
+        """Log `record`; `digest` is the content digest of its image."""
+        offset = self._file.tell()
+        self._write_line({"digest": digest, "record": record})
+        self.committed[record["image_path"]] = (offset, digest)
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def is_committed(self, image_path, digest):
+        """Whether a record for `image_path` was logged for content with
+        this `digest`."""
+        entry = self.committed.get(str(image_path))
+        return entry is not None and entry[1] is not None and entry[1] == digest
+
+    def digests(self):
+        """`{image_path: digest}` of every logged record."""
+        return {path: digest for path, (_, digest) in self.committed.items()}
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def iter_records(self, image_paths=None):
+        """Yield the logged records, in `image_paths` order when given (paths
+        without a record are skipped), otherwise in log order. Records are
+        read back one at a time, so the log is never loaded whole."""
+        self.close()
+        if image_paths is None:
+            order = sorted(offset for offset, _ in self.committed.values())
+        else:
+            order = [
+                self.committed[str(p)][0] for p in image_paths if str(p) in self.committed
+            ]
+        with open(self.path, "r") as log:
+            for offset in order:
+                log.seek(offset)
+                yield json.loads(log.readline())["record"]
+
+    def compact(self, output_path, image_paths=None):
+        """Write the logged records to `output_path` as an indented JSON
+        array, the same layout `save_metadata` produces, ordered as in
+        `iter_records`. Only one record is held in memory at a time.
+        """
+        with open(output_path, "w") as out:
+            out.write("[")
+            empty = True
+            for record in self.iter_records(image_paths):
+                lines = json.dumps(record, indent=4).split("\n")
+                out.write("\n" if empty else ",\n")
+                out.write("\n".join("    " + line for line in lines))
+                empty = False
+            out.write("]" if empty else "\n]")
+        return output_path
+
+    def remove(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,118 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+from src.incremental import weights_digest
+
+_lock = threading.Lock()
+_models = OrderedDict()  # (weights digest, device) -> (YOLO model, predict lock)
+_building = {}  # key -> lock held while the model is loaded
+
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def export_model(weights_path, backend, int8=False):
+    """Export `.pt` weights for `backend` once and return the artifact path.
+
+    Artifacts are cached next to the weights under names that spell out the
+    export settings (`<stem>.dynamic.onnx`, `<stem>.dynamic.int8.onnx`,
+    `<stem>_dynamic_openvino_model/`, `<stem>_dynamic_int8_openvino_model/`),
+    so an artifact exported with other settings is never picked up, and are
+    reused while newer than the weights. Models are exported with a dynamic
+    batch axis, so the configured `batch_size` runs as one forward pass. For
+    ONNX, `int8` applies ONNX Runtime dynamic quantization to the exported
+    model. For OpenVINO it is passed on to the ultralytics exporter, which
+    quantizes with NNCF.
+    """
+    weights = Path(weights_path)
+    if backend == "onnx":
+        target = weights.with_name(f"{weights.stem}.dynamic{'.int8' if int8 else ''}.onnx")
+    elif backend == "openvino":
+        suffix = "_dynamic_int8_openvino_model" if int8 else "_dynamic_openvino_model"
+        target = weights.with_name(weights.stem + suffix)
+    else:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    if target.exists() and target.stat().st_mtime >= weights.stat().st_mtime:
+        return str(target)
+
+    if backend == "onnx" and int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            export_model(weights_path, "onnx"), str(target), weight_type=QuantType.QUInt8
+        )
+        return str(target)
+    if backend == "onnx":
+        exported = YOLO(str(weights)).export(format="onnx", dynamic=True)
+    else:
+        exported = YOLO(str(weights)).export(format="openvino", dynamic=True, int8=int8)
+    # ultralytics names the artifact after the weights alone
+    if target.is_dir():
+        shutil.rmtree(target)
+    os.replace(exported, target)
+    return str(target)
+
+
+def get_model(
+    weights_path, device, max_models=2, warmup=True, backend="torch", int8=False
+):
+    """Return `(model, lock)` for `weights_path` on `device`, loading it only
+    once per process.
+
+    Models are keyed by the weights' content hash plus device, so the same
+    weights uploaded twice (or through different temp paths) share one
+    instance across Streamlit sessions and reruns. A freshly loaded model
+    runs one warm-up forward pass so the first real batch does not pay for
+    predictor setup. At most `max_models` stay loaded; the least recently
+    used one is evicted. Predictors are not thread-safe, so callers hold the
+    returned lock around `predict`.
+
+    With `backend` "onnx" or "openvino" the weights are exported once (see
+    `export_model`) and inference runs through ONNX Runtime or OpenVINO
+    instead of PyTorch eager mode; results come back in the same form.
+    """
+    key = (weights_digest(weights_path), device, backend, int8)
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        building = _building.setdefault(key, threading.Lock())
+
+    # one session loads (and exports) a model while others wanting the same
+    # one wait; lookups of models that are already loaded are not blocked
+    with building:
+        with _lock:
+            if key in _models:
+                return _models[key]
+        if backend == "torch":
+            model = YOLO(weights_path)
+            model.to(device)
+        else:
+            # exported models pick their device at predict time
+            model = YOLO(export_model(weights_path, backend, int8), task="detect")
+        if warmup:
+            model.predict(
+                source=np.zeros((64, 64, 3), dtype=np.uint8),
+                device=device,
+                save=False,
+                verbose=False,
+            )
+        entry = (model, threading.Lock())
+        with _lock:
+            _models[key] = entry
+            _building.pop(key, None)
+            while len(_models) > max_models:
+                _models.popitem(last=False)
+    return entry
+
+
+def clear():
+    with _lock:
+        _models.clear()
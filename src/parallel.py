@@ -0,0 +1,94 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.profiling import StageTimings
+
+# One inference instance per worker process, created by `_init_worker`.
+_worker_inference = None
+
+
+def _init_worker(model_name, device, backend, threads_per_worker):
+    global _worker_inference
+    import torch
+    from src.inference import YOLOv11Inference
+
+    torch.set_num_threads(threads_per_worker)
+    _worker_inference = YOLOv11Inference(model_name, device=device, backend=backend)
+    # the worker itself must not fan out again
+    _worker_inference.workers = 1
+
+
+def _process_shard(image_paths, batch_size=None):
+    errors = []
+
+    def collect_error(img_path, e):
+        # exceptions are not always picklable, send the message back instead
+        errors.append((img_path, f"{type(e).__name__}: {e}"))
+
+    _worker_inference.timings = StageTimings()
+    metadata = _worker_inference.process_batch(
+        image_paths, batch_size=batch_size, on_error=collect_error
+    )
+    timings = _worker_inference.timings
+    return metadata, errors, (timings.export(), timings.images)
+
+
+def iter_shards(image_paths, shard_size):
+    shard = []
+    for img_path in image_paths:
+        shard.append(img_path)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def iter_parallel_batches(
+    model_name,
+    image_paths,
+    workers,
+    threads_per_worker=1,
+    device="cpu",
+    backend="torch",
+    shard_size=64,
+    batch_size=None,
+    on_error=None,
+    timings=None,
+):
+    """Yield `(attempted_paths, metadata)` per shard of `image_paths`, processed
+    by a pool of `workers` processes that each load the model once.
+
+    Shards are handed out dynamically so fast workers pick up more work, but
+    results are yielded in input order, so the merged metadata is the same
+    no matter how the work was scheduled. At most two shards per worker are
+    in flight, which keeps memory bounded for long path streams. Stage
+    timings measured in the workers are merged into `timings`. Workers send
+    `batch_size` images through each `predict` call, like the in-process
+    path (default: `model.batch_size` from the config).
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_name, device, backend, threads_per_worker),
+    ) as pool:
+        pending = deque()
+        for shard in iter_shards(image_paths, shard_size):
+            pending.append((shard, pool.submit(_process_shard, shard, batch_size)))
+            if len(pending) >= 2 * workers:
+                yield _collect(*pending.popleft(), on_error, timings)
+        while pending:
+            yield _collect(*pending.popleft(), on_error, timings)
+
+
+def _collect(shard, future, on_error, timings):
+    metadata, errors, (samples, images) = future.result()
+    if timings is not None:
+        timings.merge(samples, images)
+    if on_error is not None:
+        for img_path, message in errors:
+            on_error(img_path, RuntimeError(message))
+    return shard, metadata
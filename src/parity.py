@@ -0,0 +1,133 @@
+import argparse
+import json
+
+import numpy as np
+
+from src.inference import YOLOv11Inference
+
+
+def box_iou(a, b):
+    """Pairwise IoU between two (N, 4) and (M, 4) arrays of xyxy boxes."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """Greedily match two detection lists class by class.
+
+    Returns `(pairs, unmatched)`: the (iou, confidence delta) of every
+    matched pair and the number of detections left over on either side.
+    """
+    pairs, unmatched = [], 0
+    classes = {det["class"] for det in reference} | {det["class"] for det in candidate}
+    for cls in classes:
+        ref = [det for det in reference if det["class"] == cls]
+        cand = [det for det in candidate if det["class"] == cls]
+        if not ref or not cand:
+            unmatched += len(ref) + len(cand)
+            continue
+        iou = box_iou([d["bbox"] for d in ref], [d["bbox"] for d in cand])
+        used_ref, used_cand = set(), set()
+        for flat in np.argsort(-iou, axis=None):
+            i, j = np.unravel_index(flat, iou.shape)
+            if iou[i, j] < iou_threshold:
+                break
+            if i in used_ref or j in used_cand:
+                continue
+            used_ref.add(i)
+            used_cand.add(j)
+            pairs.append((float(iou[i, j]), abs(ref[i]["confidence"] - cand[j]["confidence"])))
+        unmatched += len(ref) - len(used_ref) + len(cand) - len(used_cand)
+    return pairs, unmatched
+
+
+def compare_backends(
+    weights_path,
+    image_paths,
+    backend,
+    device="cpu",
+    iou_threshold=0.9,
+    conf_tolerance=0.05,
+    batch_size=None,
+):
+    """Run `image_paths` through the torch backend and `backend` and report
+    how far the detections diverge.
+
+    The check passes when every image has the same per-class counts and every
+    matched box overlaps with IoU >= `iou_threshold` and a confidence within
+    `conf_tolerance`. Both backends run batches of `batch_size` images (the
+    configured size by default), so exports are checked at the batch shape
+    they serve.
+    """
+    reference = YOLOv11Inference(weights_path, device=device, backend="torch")
+    candidate = YOLOv11Inference(weights_path, device=device, backend=backend)
+    expected = {md["image_path"]: md for md in reference.process_batch(image_paths, batch_size)}
+    actual = {md["image_path"]: md for md in candidate.process_batch(image_paths, batch_size)}
+
+    count_mismatches = []
+    ious, conf_deltas, unmatched = [], [], 0
+    for img_path, ref in expected.items():
+        cand = actual.get(img_path)
+        if cand is None or cand["class_counts"] != ref["class_counts"]:
+            count_mismatches.append(img_path)
+        if cand is None:
+            continue
+        pairs, leftover = match_detections(ref["detections"], cand["detections"])
+        ious.extend(iou for iou, _ in pairs)
+        conf_deltas.extend(delta for _, delta in pairs)
+        unmatched += leftover
+
+    min_iou = min(ious) if ious else 1.0
+    max_conf_delta = max(conf_deltas) if conf_deltas else 0.0
+    return {
+        "backend": backend,
+        "int8": candidate.int8,
+        "batch_size": batch_size or candidate.batch_size,
+        "images": len(expected),
+        "count_mismatches": count_mismatches,
+        "matched_boxes": len(ious),
+        "unmatched_boxes": unmatched,
+        "mean_iou": float(np.mean(ious)) if ious else 1.0,
+        "min_iou": min_iou,
+        "max_conf_delta": max_conf_delta,
+        "passed": not count_mismatches
+        and unmatched == 0
+        and min_iou >= iou_threshold
+        and max_conf_delta <= conf_tolerance,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare detections of an exported backend against torch."
+    )
+    parser.add_argument("weights")
+    parser.add_argument("image_dir")
+    parser.add_argument("--backend", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--limit", type=int, default=50, help="number of sample images")
+    parser.add_argument("--iou", type=float, default=0.9)
+    parser.add_argument("--conf-tolerance", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    sample = YOLOv11Inference(args.weights, device=args.device).list_image_paths(
+        args.image_dir
+    )[: args.limit]
+    report = compare_backends(
+        args.weights,
+        sample,
+        args.backend,
+        device=args.device,
+        iou_threshold=args.iou,
+        conf_tolerance=args.conf_tolerance,
+        batch_size=args.batch_size,
+    )
+    print(json.dumps(report, indent=4))
+    raise SystemExit(0 if report["passed"] else 1)
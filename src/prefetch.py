@@ -0,0 +1,43 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetch(items, load, workers=4, depth=16):
+    """Yield `(item, value, error)` for every item, in input order.
+
+    `load(item)` runs on a pool of `workers` threads, staying at most `depth`
+    items ahead of the consumer so file reads and decoding overlap with
+    whatever the caller does with the previous results. `items` is consumed
+    lazily, so generators work too. A `depth` or `workers` of 0 loads
+    serially on the calling thread.
+
+    Exceptions raised by `load` are returned as `error` (with `value` None)
+    rather than raised, so one bad item does not stop the stream.
+    """
+    if depth <= 0 or workers <= 0:
+        for item in items:
+            yield _call(item, load)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append((item, pool.submit(load, item)))
+            if len(pending) >= depth:
+                yield _resolve(*pending.popleft())
+        while pending:
+            yield _resolve(*pending.popleft())
+
+
+def _call(item, load):
+    try:
+        return item, load(item), None
+    except Exception as e:
+        return item, None, e
+
+
+def _resolve(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
@@ -0,0 +1,215 @@
+import argparse
+import ast
+import cProfile
+import json
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+# read: file read + decode, preprocess/inference/postprocess: ultralytics'
+# own `result.speed`, build: our metadata dict construction, serialize:
+# writing the record out.
+STAGES = ("read", "preprocess", "inference", "postprocess", "build", "serialize")
+
+
+class StageTimings:
+    """Per-image stage timings (in milliseconds) for an indexing run.
+
+    Samples are kept in compact float arrays so a long run costs a few bytes
+    per image and stage. `summary` reduces them to p50/p95/p99 and overall
+    throughput.
+    """
+
+    def __init__(self):
+        self.samples = {stage: array("d") for stage in STAGES}
+        self.images = 0
+        self.started = time.perf_counter()
+
+    def add(self, stage, ms):
+        self.samples[stage].append(ms)
+
+    def add_speed(self, speed):
+        """Record the `speed` dict ultralytics attaches to each result."""
+        for stage in ("preprocess", "inference", "postprocess"):
+            if speed.get(stage) is not None:
+                self.samples[stage].append(speed[stage])
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def merge(self, samples, images):
+        """Fold in `export()` output from another process."""
+        for stage, values in samples.items():
+            self.samples[stage].extend(values)
+        self.images += images
+
+    def export(self):
+        return {stage: list(values) for stage, values in self.samples.items()}
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        stages = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            data = np.frombuffer(values, dtype=np.float64)
+            p50, p95, p99 = np.percentile(data, [50, 95, 99])
+            stages[stage] = {
+                "count": len(data),
+                "mean_ms": float(data.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "total_s": float(data.sum() / 1000),
+            }
+        return {
+            "images": self.images,
+            "elapsed_s": elapsed,
+            "images_per_s": self.images / elapsed if elapsed else 0.0,
+            "stages": stages,
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        return path
+
+
+class StackSampler:
+    """Sample the stack of one thread every `interval_ms` and write the result
+    in folded-stack format ("frame;frame;frame count" per line), the format
+    py-spy and flamegraph tools read. Cheaper than cProfile for long runs.
+    """
+
+    def __init__(self, output_path, interval_ms=10, thread_id=None):
+        self.output_path = output_path
+        self.interval = interval_ms / 1000
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        with open(self.output_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_run(mode, output_dir, interval_ms=10):
+    """Profile the enclosed block with cProfile ("cprofile", written to
+    `ingest.prof`) or the stack sampler ("sampling", `ingest.folded`); any
+    other mode is a no-op."""
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(output_dir / "ingest.prof"))
+    elif mode == "sampling":
+        with StackSampler(output_dir / "ingest.folded", interval_ms):
+            yield
+    else:
+        yield
+
+
+# packages whose presence at startup means the inference stack was loaded
+HEAVY_PACKAGES = ("torch", "ultralytics", "cv2", "onnxruntime", "openvino")
+
+
+def script_imports(script_path):
+    """Modules imported at the top level of a script, e.g. what a Streamlit
+    rerun of `process-ui.py` imports before any widget runs."""
+    tree = ast.parse(open(script_path, encoding="utf-8").read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def import_costs(modules):
+    """Import `modules` in a fresh interpreter under `-X importtime` and
+    return `{top-level package: self time in ms}`, covering everything they
+    pull in transitively, most expensive first."""
+    code = "\n".join(f"import {module}" for module in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    costs = Counter()
+    for line in completed.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        costs[name.strip().split(".")[0]] += int(self_us) / 1000
+    return dict(costs.most_common())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report the import cost per package of the UI's startup imports."
+    )
+    parser.add_argument("mode", choices=["imports"])
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        help="modules to import (default: the top-level imports of --script)",
+    )
+    parser.add_argument("--script", default="process-ui.py")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    modules = args.modules or script_imports(args.script)
+    costs = import_costs(modules)
+    heavy = [package for package in HEAVY_PACKAGES if package in costs]
+    if args.json:
+        report = {
+            "modules": modules,
+            "total_ms": sum(costs.values()),
+            "heavy_packages": heavy,
+            "packages": costs,
+        }
+        print(json.dumps(report, indent=4))
+    else:
+        for package, ms in list(costs.items())[: args.top]:
+            print(f"{ms:10.1f} ms  {package}")
+        print(f"{sum(costs.values()):10.1f} ms  total ({len(costs)} packages)")
+        print(f"inference stack loaded: {', '.join(heavy) if heavy else 'no'}")
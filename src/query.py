@@ -0,0 +1,81 @@
+import numpy as np
+
+# Per-class conditions understood by `SearchIndex.search`, in addition to the
+# legacy max-count `thresholds`. Counts are per image; the rest filter which
+# detections are counted. Areas are in square pixels, aspect is width/height,
+# `region` is a normalized (x1, y1, x2, y2) box matched according to
+# `region_mode` ("intersects" or "contains", see `src.spatial`).
+COUNT_FILTERS = ("min_count", "max_count")
+DETECTION_FILTERS = (
+    "min_conf",
+    "min_area",
+    "max_area",
+    "min_aspect",
+    "max_aspect",
+    "region",
+)
+
+
+def class_conditions(search_parameters, cls):
+    """Collect the conditions set for `cls` into one dict.
+
+    Merges `search_parameters["filters"][cls]` with the legacy
+    `thresholds[cls]` ("None" or a max count) and drops unset (None) values.
+    """
+    filters = search_parameters.get("filters", {}).get(cls, {})
+    conditions = {key: value for key, value in filters.items() if value is not None}
+    if "region" in conditions:
+        conditions["region"] = tuple(conditions["region"])
+        conditions.setdefault("region_mode", "intersects")
+    else:
+        conditions.pop("region_mode", None)
+    threshold = search_parameters.get("thresholds", {}).get(cls, "None")
+    if threshold not in ("None", None) and "max_count" not in conditions:
+        conditions["max_count"] = int(threshold)
+    return conditions
+
+
+def count_range(conditions):
+    """Return `(min, max)` detections per image; `max` may be None.
+
+    Without explicit bounds a class must appear at least once; with only a
+    maximum, images without the class match too, as with the original
+    max-count thresholds.
+    """
+    high = conditions.get("max_count")
+    low = conditions.get("min_count", 1 if high is None else 0)
+    return low, high
+
+
+def in_range(values, low, high):
+    mask = values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def detection_mask(columns, class_id, conditions, spatial=None):
+    """Vectorized predicate over every detection in `columns`
+    (a `ColumnarMetadata`) for one class and its detection filters. Region
+    conditions are answered by `spatial`, a `GridIndex` over `columns`."""
+    mask = columns.class_id == class_id
+    if "region" in conditions:
+        mask &= spatial.query(conditions["region"], conditions["region_mode"])
+    if "min_conf" in conditions:
+        mask &= columns.confidence >= conditions["min_conf"]
+    if "min_area" in conditions or "max_area" in conditions:
+        areas = columns.box_areas()
+        mask &= in_range(areas, conditions.get("min_area", 0), conditions.get("max_area"))
+    if "min_aspect" in conditions or "max_aspect" in conditions:
+        aspects = columns.box_aspects()
+        mask &= in_range(
+            aspects, conditions.get("min_aspect", 0), conditions.get("max_aspect")
+        )
+    return mask
+
+
+def filtered_counts(columns, class_id, conditions, spatial=None):
+    """Per-image number of detections passing the filters, grouped with a
+    bincount over the detection image ids."""
+    mask = detection_mask(columns, class_id, conditions, spatial)
+    return np.bincount(columns.image_id[mask], minlength=len(columns))
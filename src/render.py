@@ -0,0 +1,71 @@
+import base64
+import html
+import io
+
+from PIL import Image
+
+MATCH_COLOR = "#00ff00"  # Green for matches
+OTHER_COLOR = "#c0c0c0"  # Gray for non-matches
+
+
+def image_to_base64(image) -> str:
+    """Convert an image (PIL image or already-encoded JPEG bytes) to a
+    base64-encoded JPEG string."""
+    if isinstance(image, Image.Image):
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=85)
+        image = buffered.getvalue()
+    img_base64 = base64.b64encode(image).decode("utf-8")
+    return img_base64
+
+
+def detections_svg(detections, width, height, search_parameters, highlight_matches):
+    """
+    Build an SVG overlay with bounding boxes and labels for one image.
+
+    The overlay is drawn in original image pixels (`viewBox` of `width` x
+    `height`), so `bbox` values are used as they are and the browser scales
+    it onto whatever is displayed underneath, thumbnail or original. Nothing
+    is rasterized on the server.
+
+    Args:
+        detections: list of detection dicts (with 'class', 'bbox', 'confidence')
+        width, height: original image size in pixels
+        search_parameters: dict with 'selected_classes' (list)
+        highlight_matches: bool, whether to highlight matches
+
+    Returns:
+        SVG markup as a string; position it over the image with CSS
+    """
+    font_size = max(width, height) / 32
+    shapes = []
+    for det in detections:
+        cls = det["class"]
+        x1, y1, x2, y2 = det["bbox"]
+        if cls in search_parameters["selected_classes"] and highlight_matches:
+            box_color, thickness = MATCH_COLOR, 3
+        elif not highlight_matches:
+            box_color, thickness = OTHER_COLOR, 1
+        else:
+            continue
+
+        shapes.append(
+            f'<rect x="{x1:.1f}" y="{y1:.1f}" width="{x2 - x1:.1f}" height="{y2 - y1:.1f}" '
+            f'fill="none" stroke="{box_color}" stroke-width="{thickness}" '
+            'vector-effect="non-scaling-stroke"/>'
+        )
+        label = f"{cls} ({det['confidence']:.2f})"
+        # no font metrics on the server; approximate the label width
+        shapes.append(
+            f'<rect x="{x1:.1f}" y="{y1:.1f}" width="{0.6 * font_size * len(label) + 4:.1f}" '
+            f'height="{font_size * 1.3:.1f}" fill="{box_color}"/>'
+            f'<text x="{x1 + 2:.1f}" y="{y1 + font_size:.1f}" font-size="{font_size:.1f}" '
+            f'font-family="sans-serif" fill="black">{html.escape(label)}</text>'
+        )
+
+    # "slice" matches the `object-fit: cover` of the image underneath
+    return (
+        f'<svg class="box-overlay" viewBox="0 0 {width} {height}" '
+        f'preserveAspectRatio="xMidYMid slice" xmlns="http://www.w3.org/2000/svg">'
+        f'{"".join(shapes)}</svg>'
+    )
@@ -0,0 +1,197 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from src.columnar import ColumnarMetadata
+from src.spatial import GridIndex
+from src.query import (
+    DETECTION_FILTERS,
+    class_conditions,
+    count_range,
+    filtered_counts,
+    in_range,
+)
+
+OR_MODE = "Any of the selected classes (OR)"
+AND_MODE = "All of the selected classes (AND)"
+
+
+class SearchIndex:
+    """Inverted class index over a metadata list (or `ColumnarMetadata`),
+    built once per load.
+
+    For every class it keeps a posting list of image ids (positions in
+    `metadata`) together with that image's detection count, as sorted int32
+    arrays. Queries turn each selected class into a boolean image mask and
+    combine the masks with OR/AND, instead of rescanning every detection.
+    """
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.num_images = len(metadata)
+        # identifies this particular load of the metadata in search caches
+        self.version = uuid.uuid4().hex
+        self._columns = None
+        self._class_ids = {}
+        self._spatial = None
+        # lazily built structures may be requested by several sessions at once
+        self._lock = threading.Lock()
+
+        if isinstance(metadata, ColumnarMetadata):
+            # columnar metadata can build the posting lists without Python loops
+            self.postings = metadata.class_postings()
+            self._columns = metadata
+            self._class_ids = {
+                name: cid for cid, name in enumerate(metadata.class_names)
+            }
+            return
+
+        image_ids = {}
+        counts = {}
+        for image_id, item in enumerate(metadata):
+            for cls, count in _class_counts(item).items():
+                image_ids.setdefault(cls, []).append(image_id)
+                counts.setdefault(cls, []).append(count)
+
+        self.postings = {
+            cls: (
+                np.asarray(image_ids[cls], dtype=np.int32),
+                np.asarray(counts[cls], dtype=np.int32),
+            )
+            for cls in image_ids
+        }
+
+    @property
+    def columns(self):
+        """The metadata as `ColumnarMetadata`, converted on first use for
+        queries that filter individual detections."""
+        if self._columns is None:
+            self._columns = ColumnarMetadata.from_records(self.metadata)
+            self._class_ids = {
+                name: cid for cid, name in enumerate(self._columns.class_names)
+            }
+        return self._columns
+
+    @property
+    def spatial(self):
+        """Grid index over normalized boxes, built on the first region query."""
+        with self._lock:
+            if self._spatial is None:
+                self._spatial = GridIndex(self.columns)
+        return self._spatial
+
+    def class_mask(self, cls, conditions):
+        """Boolean mask of images matching the conditions for one class
+        (see `src.query`).
+
+        Count-only conditions are answered from the posting lists; images
+        missing from a class's list have a count of zero. Detection filters
+        (confidence, box area, aspect ratio, region) are evaluated as
+        vectorized predicates over the flat detection arrays, grouped per
+        image.
+        """
+        low, high = count_range(conditions)
+        if any(key in conditions for key in DETECTION_FILTERS):
+            columns = self.columns
+            class_id = self._class_ids.get(cls, -1)
+            spatial = self.spatial if "region" in conditions else None
+            counts = filtered_counts(columns, class_id, conditions, spatial)
+            return in_range(counts, low, high)
+
+        ids, counts = self.postings.get(cls, (_EMPTY, _EMPTY))
+        mask = np.full(self.num_images, low == 0, dtype=bool)
+        mask[ids] = in_range(counts, low, high)
+        return mask
+
+    def search(self, search_parameters):
+        """Return the sorted image ids matching `search_parameters`
+        (search_mode, selected_classes, thresholds and optional per-class
+        filters)."""
+        masks = [
+            self.class_mask(cls, class_conditions(search_parameters, cls))
+            for cls in search_parameters["selected_classes"]
+        ]
+        if search_parameters["search_mode"] == OR_MODE:
+            combined = np.zeros(self.num_images, dtype=bool)
+            for mask in masks:
+                combined |= mask
+        else:  # All of the selected classes (AND)
+            combined = np.ones(self.num_images, dtype=bool)
+            for mask in masks:
+                combined &= mask
+        return np.flatnonzero(combined).astype(np.int32)
+
+    def summarize(self, image_ids):
+        """Return `{class: (images, objects)}` over the images in `image_ids`."""
+        selected = np.zeros(self.num_images, dtype=bool)
+        selected[image_ids] = True
+        summary = {}
+        for cls, (ids, counts) in self.postings.items():
+            hit = selected[ids]
+            if hit.any():
+                summary[cls] = (int(hit.sum()), int(counts[hit].sum()))
+        return summary
+
+
+def normalize_query(search_parameters):
+    """Hashable form of a query: conditions of unselected classes are
+    dropped and the selected classes are order-independent."""
+    return (
+        search_parameters["search_mode"],
+        tuple(
+            sorted(
+                (cls, tuple(sorted(class_conditions(search_parameters, cls).items())))
+                for cls in search_parameters["selected_classes"]
+            )
+        ),
+    )
+
+
+class SearchCache:
+    """Bounded LRU of search results, keyed by the normalized query and the
+    version of the index it ran against.
+
+    Entries are the read-only image id arrays returned by
+    `SearchIndex.search`, not copies of the metadata. Entries for an older
+    index version are dropped as soon as a newer one is queried, so loading
+    or ingesting new metadata invalidates the cache by itself.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def search(self, index, search_parameters):
+        key = normalize_query(search_parameters)
+        with self._lock:
+            if index.version != self._version:
+                self._entries.clear()
+                self._version = index.version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        image_ids = index.search(search_parameters)
+        image_ids.setflags(write=False)
+        with self._lock:
+            if index.version == self._version:
+                self._entries[key] = image_ids
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return image_ids
+
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _class_counts(item):
+    if "class_counts" in item:
+        return item["class_counts"]
+    counts = {}
+    for det in item.get("detections", []):
+        counts[det["class"]] = counts.get(det["class"], 0) + 1
+    return counts
@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import json
+import mimetypes
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.config import load_config
+from src.index_registry import IndexRegistry
+from src.query import COUNT_FILTERS, DETECTION_FILTERS
+from src.search_index import AND_MODE, OR_MODE
+from src.spatial import REGION_MODES
+from src.thumbnails import ThumbnailCache
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+FLOAT_FILTERS = tuple(key for key in DETECTION_FILTERS if key != "region")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def search_parameters_from_query(query):
+    """Turn URL query parameters into the `search_parameters` dict the UI
+    builds, so the service answers queries with the same semantics.
+
+    `classes=car,person` selects classes and `mode=and` switches from the
+    default OR. Filters apply to every selected class (`min_conf=0.5`) or to
+    one (`min_conf.car=0.5`, `max_count.person=2`,
+    `region.car=0,0,0.5,1&region_mode.car=contains`); see `src.query`.
+    """
+    def single(name):
+        return query[name][-1] if name in query else None
+
+    classes = [cls for cls in (single("classes") or "").split(",") if cls]
+    mode = (single("mode") or "or").lower()
+    if mode not in ("or", "and"):
+        raise HTTPError(400, f"mode must be 'or' or 'and', got {mode!r}")
+
+    filters = {cls: {} for cls in classes}
+    for name, values in query.items():
+        key, _, cls = name.partition(".")
+        if key not in COUNT_FILTERS + DETECTION_FILTERS + ("region_mode",):
+            continue
+        targets = [cls] if cls else classes
+        try:
+            if key in COUNT_FILTERS:
+                value = int(values[-1])
+            elif key in FLOAT_FILTERS:
+                value = float(values[-1])
+            elif key == "region":
+                value = tuple(float(v) for v in values[-1].split(","))
+                if len(value) != 4:
+                    raise ValueError("region needs x1,y1,x2,y2")
+            elif values[-1] in REGION_MODES:
+                value = values[-1]
+            else:
+                raise ValueError(f"must be one of {REGION_MODES}")
+        except ValueError as e:
+            raise HTTPError(400, f"invalid {name}: {e}")
+        for target in targets:
+            if target not in filters:
+                raise HTTPError(400, f"{name} filters a class that is not selected")
+            filters[target][key] = value
+
+    return {
+        "search_mode": AND_MODE if mode == "and" else OR_MODE,
+        "selected_classes": classes,
+        "thresholds": {},
+        "filters": filters,
+    }
+
+
+class SearchService:
+    """Headless HTTP/1.1 service answering searches over one dataset.
+
+    Built on asyncio streams; the dataset comes from an `IndexRegistry`, so
+    the metadata is loaded and indexed once and then memory-mapped. Searches
+    and file reads run on the default thread pool, leaving the event loop
+    free to accept and answer other connections meanwhile.
+
+    Endpoints (all GET):
+        /health                  liveness
+        /classes                 classes and their count options
+        /search?...              one page of matching records as JSON
+                                 (`page`, `page_size`), or every match as
+                                 NDJSON streamed in chunks with `stream=1`
+        /images/<id>             original image bytes
+        /thumbnails/<id>         thumbnail JPEG
+
+    A connection that sends nothing for `read_timeout` seconds while a
+    request line or header is expected is closed.
+    """
+
+    def __init__(self, dataset, thumbnails, max_page_size=500, read_timeout=30):
+        self.dataset = dataset
+        self.thumbnails = thumbnails
+        self.max_page_size = max_page_size
+        self.read_timeout = read_timeout
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await self.readline(reader)
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await self.readline(reader)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                method, target, version = request_line.decode("latin-1").split()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1"
+                    else headers.get("connection", "").lower() == "keep-alive"
+                )
+                try:
+                    if method != "GET":
+                        raise HTTPError(405, f"{method} is not supported")
+                    await self.route(writer, target, keep_alive)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    await self.send_json(writer, 500, {"error": repr(e)}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def readline(self, reader):
+        return await asyncio.wait_for(reader.readline(), self.read_timeout)
+
+    async def route(self, writer, target, keep_alive):
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/")
+        query = parse_qs(url.query)
+        if path == "/health":
+            await self.send_json(writer, 200, {"images": len(self.dataset.metadata)}, keep_alive)
+        elif path == "/classes":
+            payload = {
+                "classes": self.dataset.unique_classes,
+                "count_options": self.dataset.count_options,
+            }
+            await self.send_json(writer, 200, payload, keep_alive)
+        elif path == "/search":
+            await self.search(writer, query, keep_alive)
+        elif path.startswith("/images/"):
+            image_path = self.image_path(path.rsplit("/", 1)[1])
+            data = await asyncio.to_thread(self.read_image, image_path)
+            content_type = mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+            await self.send(writer, 200, content_type, data, keep_alive)
+        elif path.startswith("/thumbnails/"):
+            image_path = self.image_path(path.rsplit("/", 1)[1])
+            data = await asyncio.to_thread(self.read_thumbnail, image_path)
+            await self.send(writer, 200, "image/jpeg", data, keep_alive)
+        else:
+            raise HTTPError(404, f"no route for {path}")
+
+    async def search(self, writer, query, keep_alive):
+        search_parameters = search_parameters_from_query(query)
+        image_ids = await asyncio.to_thread(self.dataset.search, search_parameters)
+        if query.get("stream", ["0"])[-1] in ("1", "true"):
+            await self.start_chunked(writer, "application/x-ndjson", keep_alive)
+            try:
+                for start in range(0, len(image_ids), 256):
+                    # records are built and encoded off the event loop, so a
+                    # large stream does not hold up other connections
+                    chunk = await asyncio.to_thread(
+                        self.encode_lines, image_ids[start : start + 256]
+                    )
+                    await self.send_chunk(writer, chunk)
+            except Exception as e:
+                # the 200 status is already out, so an error body would be
+                # read as stream data; drop the connection instead and the
+                # missing final chunk tells the client the stream is cut short
+                raise ConnectionAbortedError(f"stream aborted: {e!r}") from e
+            await self.send_chunk(writer, b"")
+            return
+
+        try:
+            page = max(int(query.get("page", ["1"])[-1]), 1)
+            page_size = int(query.get("page_size", ["24"])[-1])
+        except ValueError as e:
+            raise HTTPError(400, f"invalid paging: {e}")
+        page_size = min(max(page_size, 1), self.max_page_size)
+        start = (page - 1) * page_size
+        payload = {
+            "total": len(image_ids),
+            "page": page,
+            "page_size": page_size,
+            "results": [
+                dict(self.dataset.metadata[i], id=i)
+                for i in image_ids[start : start + page_size].tolist()
+            ],
+        }
+        await self.send_json(writer, 200, payload, keep_alive)
+
+    def encode_lines(self, image_ids):
+        metadata = self.dataset.metadata
+        lines = [json.dumps(dict(metadata[i], id=i)) for i in image_ids.tolist()]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def image_path(self, image_id):
+        try:
+            if int(image_id) < 0:
+                raise IndexError(image_id)
+            return self.dataset.metadata[int(image_id)]["image_path"]
+        except (ValueError, IndexError):
+            raise HTTPError(404, f"no image {image_id}")
+
+    def read_image(self, image_path):
+        try:
+            return Path(image_path).read_bytes()
+        except OSError:
+            raise HTTPError(404, f"{image_path} is not available")
+
+    def read_thumbnail(self, image_path):
+        try:
+            return self.thumbnails.get(image_path)[0]
+        except OSError:
+            raise HTTPError(404, f"{image_path} is not available")
+
+    async def send(self, writer, status, content_type, body, keep_alive):
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def send_json(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        await self.send(writer, status, "application/json", body, keep_alive)
+
+    async def start_chunked(self, writer, content_type, keep_alive):
+        head = (
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+
+    async def send_chunk(self, writer, data):
+        # an empty chunk ends the response
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+
+async def serve(metadata_path, host="127.0.0.1", port=8765):
+    config = load_config()
+    index_config = config.get("index", {})
+    registry = IndexRegistry(
+        cache_dir=index_config.get("cache_dir", "data/index"),
+        search_cache_size=config.get("ui", {}).get("search_cache_size", 64),
+    )
+    dataset = await asyncio.to_thread(registry.get, metadata_path)
+    thumbnails = config["thumbnails"]
+    service = SearchService(
+        dataset,
+        ThumbnailCache(
+            cache_dir=thumbnails["cache_dir"],
+            size=thumbnails["size"],
+            quality=thumbnails["quality"],
+            max_disk_mb=thumbnails["max_disk_mb"],
+            max_memory_items=thumbnails["max_memory_items"],
+        ),
+        max_page_size=config.get("server", {}).get("max_page_size", 500),
+        read_timeout=config.get("server", {}).get("read_timeout_s", 30),
+    )
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving {len(dataset.metadata)} images on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    server_config = load_config().get("server", {})
+    parser = argparse.ArgumentParser(description="Headless search service over a metadata index.")
+    parser.add_argument("metadata", help="metadata.json or a metadata.columnar directory")
+    parser.add_argument("--host", default=server_config.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=server_config.get("port", 8765))
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.metadata, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
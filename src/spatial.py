@@ -0,0 +1,77 @@
+import numpy as np
+
+REGION_MODES = ("intersects", "contains")
+
+
+class GridIndex:
+    """Uniform grid over normalized box coordinates for region queries.
+
+    Every detection of a `ColumnarMetadata` is registered in each of the
+    `grid_size` x `grid_size` cells its normalized box touches, stored CSR
+    style (detection ids sorted by cell plus per-cell offsets). A query only
+    tests the detections registered in the cells under the query region, and
+    does that test vectorized. Boxes are normalized by the image's `width` and
+    `height`; detections of images without a recorded size never match.
+    """
+
+    def __init__(self, columns, grid_size=16):
+        self.grid_size = grid_size
+        self.num_detections = len(columns.image_id)
+        self.boxes = columns.normalized_boxes()
+
+        valid = np.flatnonzero(~np.isnan(self.boxes).any(axis=1))
+        x0, y0, x1, y1 = self._cells(self.boxes[valid]).T
+        nx, ny = x1 - x0 + 1, y1 - y0 + 1
+        per_box = nx * ny
+
+        # expand every box into the cells it covers without a Python loop
+        det_ids = np.repeat(valid, per_box)
+        local = np.arange(per_box.sum()) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+        cell_x = np.repeat(x0, per_box) + local % np.repeat(nx, per_box)
+        cell_y = np.repeat(y0, per_box) + local // np.repeat(nx, per_box)
+        cells = cell_y * grid_size + cell_x
+
+        order = np.argsort(cells, kind="stable")
+        self.cell_detections = det_ids[order].astype(np.int32)
+        self.cell_offsets = np.searchsorted(
+            cells[order], np.arange(grid_size * grid_size + 1)
+        )
+
+    def _cells(self, boxes):
+        cells = np.floor(np.clip(boxes, 0.0, 1.0) * self.grid_size).astype(np.int64)
+        return np.minimum(cells, self.grid_size - 1)
+
+    def query(self, region, mode="intersects"):
+        """Boolean mask over all detections whose box intersects (or, with
+        `mode` "contains", lies entirely inside) `region`, given as
+        normalized `(x1, y1, x2, y2)`."""
+        if mode not in REGION_MODES:
+            raise ValueError(f"mode must be one of {REGION_MODES}, got {mode!r}")
+        x0, y0, x1, y1 = self._cells(np.asarray(region, dtype=np.float64)[None, :])[0]
+
+        candidates = np.zeros(self.num_detections, dtype=bool)
+        for row in range(y0, y1 + 1):
+            start = self.cell_offsets[row * self.grid_size + x0]
+            stop = self.cell_offsets[row * self.grid_size + x1 + 1]
+            candidates[self.cell_detections[start:stop]] = True
+        candidates = np.flatnonzero(candidates)
+
+        boxes = self.boxes[candidates]
+        rx1, ry1, rx2, ry2 = region
+        if mode == "contains":
+            hit = (
+                (boxes[:, 0] >= rx1)
+                & (boxes[:, 1] >= ry1)
+                & (boxes[:, 2] <= rx2)
+                & (boxes[:, 3] <= ry2)
+            )
+        else:
+            hit = (
+                (boxes[:, 0] <= rx2)
+                & (boxes[:, 2] >= rx1)
+                & (boxes[:, 1] <= ry2)
+                & (boxes[:, 3] >= ry1)
+            )
+        mask = np.zeros(self.num_detections, dtype=bool)
+        mask[candidates[hit]] = True
+        return mask
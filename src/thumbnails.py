@@ -0,0 +1,207 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from src.prefetch import prefetch
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=10).hexdigest()
+
+
+class ThumbnailCache:
+    """Downscaled JPEG thumbnails for the search results grid.
+
+    Thumbnails are keyed by the image's path and a fingerprint of its size and
+    mtime, plus the thumbnail size, and are kept in two LRU tiers: up to
+    `max_memory_items` encoded thumbnails in memory, and up to `max_disk_mb`
+    on disk under `cache_dir`. The original dimensions are part of the file
+    name, so the scale needed to map `bbox` coordinates onto a thumbnail is
+    known without opening the original. When the original is gone (e.g. an
+    extracted upload that was cleaned up), the last thumbnail generated for
+    its path is served.
+    """
+
+    def __init__(
+        self,
+        cache_dir="data/thumbnails",
+        size=384,
+        quality=80,
+        max_disk_mb=1024,
+        max_memory_items=512,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.quality = quality
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.max_memory_items = max_memory_items
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # file name -> (jpeg bytes, scale)
+        self._files = {}  # path digest -> file name, for this thumbnail size
+        self._disk_bytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".jpg"):
+                self._disk_bytes += entry.stat().st_size
+                path_key, _, size, _ = entry.name[:-4].split("-")
+                if int(size) == self.size:
+                    self._files[path_key] = entry.name
+
+    def get(self, image_path):
+        """Return `(jpeg_bytes, scale)` for `image_path`, where `scale`
+        multiplies original pixel coordinates into thumbnail coordinates."""
+        image_path = str(image_path)
+        path_key = _digest(os.path.abspath(image_path))
+        try:
+            stat = os.stat(image_path)
+            stat_key = _digest(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            stat_key = None
+
+        with self._lock:
+            name = self._files.get(path_key)
+        if name is not None and (stat_key is None or name.split("-")[1] == stat_key):
+            cached = self._read(name)
+            if cached is not None:
+                return cached
+        if stat_key is None:
+            raise FileNotFoundError(image_path)
+        return self._generate(image_path, path_key, stat_key)
+
+    def locate(self, image_path):
+        """Return `(file_name, (width, height))` of the thumbnail for
+        `image_path` under `cache_dir`, generating it if needed, with the
+        original dimensions; for serving the file directly instead of its
+        bytes."""
+        image_path = str(image_path)
+        path_key = _digest(os.path.abspath(image_path))
+        try:
+            stat = os.stat(image_path)
+            stat_key = _digest(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            stat_key = None
+
+        with self._lock:
+            name = self._files.get(path_key)
+        if name is None or (stat_key is not None and name.split("-")[1] != stat_key):
+            if stat_key is None:
+                raise FileNotFoundError(image_path)
+            self._generate(image_path, path_key, stat_key)
+            with self._lock:
+                name = self._files[path_key]
+        else:
+            try:
+                os.utime(self.cache_dir / name)
+            except OSError:
+                # evicted by another process; rebuild from the original
+                if stat_key is None:
+                    raise FileNotFoundError(image_path)
+                self._generate(image_path, path_key, stat_key)
+        width, height = name[:-4].split("-")[3].split("x")
+        return name, (int(width), int(height))
+
+    def put(self, image_path, data):
+        """Build the thumbnail for `image_path` from its encoded bytes, for
+        images that are never written to disk (e.g. ZIP members)."""
+        image_path = str(image_path)
+        path_key = _digest(os.path.abspath(image_path))
+        try:
+            stat = os.stat(image_path)
+            stat_key = _digest(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            stat_key = hashlib.blake2b(data, digest_size=10).hexdigest()
+        return self._generate(io.BytesIO(data), path_key, stat_key)
+
+    def warm(self, image_paths, workers=4):
+        """Generate thumbnails for `image_paths` ahead of time, e.g. while
+        indexing. Failures are ignored; they will surface on first view."""
+        for _ in prefetch(image_paths, self.get, workers=workers, depth=2 * workers):
+            pass
+
+    def _read(self, name):
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                return self._memory[name]
+        try:
+            data = (self.cache_dir / name).read_bytes()
+            # mtime doubles as the on-disk LRU clock
+            os.utime(self.cache_dir / name)
+        except OSError:
+            return None
+        entry = (data, self._scale_from_name(name, data))
+        self._remember(name, entry)
+        return entry
+
+    def _scale_from_name(self, name, data):
+        width = int(name[:-4].split("-")[3].split("x")[0])
+        with Image.open(io.BytesIO(data)) as thumb:
+            return thumb.width / width
+
+    def _generate(self, source, path_key, stat_key):
+        with Image.open(source) as image:
+            width, height = image.size
+            # let the JPEG decoder downscale while decoding
+            image.draft("RGB", (self.size, self.size))
+            image = image.convert("RGB")
+            image.thumbnail((self.size, self.size))
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=self.quality)
+            scale = image.width / width
+        data = buffer.getvalue()
+
+        name = f"{path_key}-{stat_key}-{self.size}-{width}x{height}.jpg"
+        tmp_path = self.cache_dir / f"{name}.tmp"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.cache_dir / name)
+
+        with self._lock:
+            old = self._files.get(path_key)
+            self._files[path_key] = name
+            self._disk_bytes += len(data)
+        if old is not None and old != name:
+            self._delete(old)
+        entry = (data, scale)
+        self._remember(name, entry)
+        self._enforce_disk_budget()
+        return entry
+
+    def _remember(self, name, entry):
+        with self._lock:
+            self._memory[name] = entry
+            self._memory.move_to_end(name)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _delete(self, name):
+        try:
+            size = (self.cache_dir / name).stat().st_size
+            (self.cache_dir / name).unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+            self._memory.pop(name, None)
+
+    def _enforce_disk_budget(self):
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        entries = sorted(
+            (e for e in os.scandir(self.cache_dir) if e.name.endswith(".jpg")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        # evict down to 90% so we do not rescan on every insert
+        for entry in entries:
+            if self._disk_bytes <= 0.9 * self.max_disk_bytes:
+                break
+            path_key = entry.name.split("-")[0]
+            with self._lock:
+                if self._files.get(path_key) == entry.name:
+                    del self._files[path_key]
+            self._delete(entry.name)
@@ -1,5 +1,6 @@
 from pathlib import Path
 import json
+import os
 
 def ensure_dir_exists(path):
 	"""
@@ -10,6 +11,25 @@ def ensure_dir_exists(path):
 	processed_path.mkdir(parents=True, exist_ok=True)
 	return processed_path
   
+def iter_image_paths(directory, extensions, recursive=True, sort=True):
+	"""
+	Yield image paths under `directory` in a single os.scandir walk.
+
+	Extensions match case-insensitively, so `.JPG` counts as `.jpg`. With
+	`sort`, each directory's entries are visited in name order, which yields
+	the same order as sorting the full list of paths while only holding one
+	directory listing per level in memory.
+	"""
+	extensions = {ext.lower() for ext in extensions}
+	with os.scandir(directory) as it:
+		entries = sorted(it, key=lambda e: e.name) if sort else list(it)
+	for entry in entries:
+		if entry.is_dir(follow_symlinks=False):
+			if recursive:
+				yield from iter_image_paths(entry.path, extensions, recursive, sort)
+		elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+			yield Path(entry.path)
+
 def save_metadata(metadata, raw_path):
 	"""
 	Save metadata to a JSON file.